@@ -0,0 +1,137 @@
+import datetime
+import json
+from flask import request, abort, current_app
+from sqlalchemy import func
+from models import db, Artist, Venue, Show, live_shows
+from fragments import fragment_cache
+from pagination import get_datetime_arg
+from search import has_genre
+
+#----------------------------------------------------------------------------#
+# Show calendar.
+#----------------------------------------------------------------------------#
+# /shows/calendar?from=2031-01-03&to=2031-01-09&city=&genre= and its JSON
+# twin /api/v1/shows/calendar list the shows of a window of days (this week
+# by default), day by day, optionally at venues of a city and of artists of
+# a genre.
+#
+# Each day is a bucket of JSON kept in the fragment cache for
+# CALENDAR_DAY_TTL seconds, keyed on its date and the filters (in each
+# worker for FRAGMENT_CACHE_LOCAL_TTL seconds without a shared cache, see
+# fragments.py). The days
+# missing from the cache are read with one range scan of start_time
+# (ix_Show_start_time) joined to the venue and the artist, so a page whose
+# days are all cached runs no query. Listing shows (scheduling.py, the
+# importer) invalidates their days; other changes, such as renamed venues
+# or deleted artists, show up when the TTL runs out.
+
+BUCKET = 'calendar-day'
+
+# the days a window may cover: load() reads up to the day after the last one
+FIRST_DAY = datetime.date.min
+LAST_DAY = datetime.date.max - datetime.timedelta(days=1)
+
+
+def day_tag(day):
+    # tag of the cached buckets of a date
+    return 'Calendar:%s' % day.isoformat()
+
+
+def window():
+    # (first day, last day, city, genre) from the request's ?from= ?to=
+    # ?city= ?genre=, aborts with 400 on a bad or too long window
+    start = get_datetime_arg('from')
+    start = start.date() if start is not None else datetime.date.today()
+    end = get_datetime_arg('to')
+    if end is not None:
+        end = end.date()
+    elif start <= LAST_DAY:
+        # a week, or what is left of it before LAST_DAY
+        end = start + min(datetime.timedelta(days=6), LAST_DAY - start)
+    else:
+        abort(400)
+    days = (end - start).days + 1
+    if not 0 < days <= current_app.config['CALENDAR_MAX_DAYS'] or \
+            end > LAST_DAY:
+        abort(400)
+    city = request.args.get('city', '').strip()
+    genre = request.args.get('genre', '').strip()
+    return start, end, city, genre
+
+
+def pager(start, end):
+    # the (first day, last day) of the windows of the same length before and
+    # after this one, None where it would start before FIRST_DAY or end
+    # after LAST_DAY
+    length = end - start + datetime.timedelta(days=1)
+    earlier = later = None
+    if start - FIRST_DAY >= length:
+        earlier = (start - length, end - length)
+    if LAST_DAY - end >= length:
+        later = (start + length, end + length)
+    return earlier, later
+
+
+def load(start, end, city, genre):
+    # {date: [show]} for the shows starting between the dates (end excluded)
+    query = db.session.query(
+        Show.start_time,
+        Show.duration,
+        Show.artist_id,
+        Artist.name,
+        Artist.image_link,
+        Show.venue_id,
+        Venue.name,
+        Venue.city,
+        Venue.state
+    ).join(Venue, Show.venue_id == Venue.id).\
+        join(Artist, Show.artist_id == Artist.id).\
+        filter(
+            Show.start_time >= datetime.datetime.combine(start, datetime.time()),
+            Show.start_time < datetime.datetime.combine(end, datetime.time()),
+            live_shows())
+    if city:
+        query = query.filter(func.lower(Venue.city) == city.lower())
+    if genre:
+        query = query.filter(has_genre(Artist.genres, genre))
+
+    shows = {}
+    for (start_time, duration, artist_id, artist_name, artist_image_link,
+         venue_id, venue_name, venue_city, venue_state) in \
+            query.order_by(Show.start_time, Show.artist_id):
+        shows.setdefault(start_time.date(), []).append({
+            'start_time': start_time.isoformat(),
+            'duration': duration,
+            'artist_id': artist_id,
+            'artist_name': artist_name,
+            'artist_image_link': artist_image_link,
+            'venue_id': venue_id,
+            'venue_name': venue_name,
+            'venue_city': venue_city,
+            'venue_state': venue_state,
+        })
+    return shows
+
+
+def buckets(start, end, city, genre):
+    """
+    [(date, JSON list of its shows)] for every day from `start` to `end`
+    (included), from the cache or, for the days not in it, one query.
+    """
+    days = [start + datetime.timedelta(days=n)
+            for n in range((end - start).days + 1)]
+    # the filters are one part, so that no two of them make the same key
+    filters = json.dumps([city.lower(), genre])
+    found = {day: fragment_cache.get((BUCKET, day.isoformat(), filters),
+                                     local=True)
+             for day in days}
+    missing = [day for day in days if found[day] is None]
+    if missing:
+        shows = load(missing[0], missing[-1] + datetime.timedelta(days=1),
+                     city, genre)
+        for day in missing:
+            found[day] = json.dumps(shows.get(day, []))
+            fragment_cache.set((BUCKET, day.isoformat(), filters), found[day],
+                               current_app.config['CALENDAR_DAY_TTL'],
+                               ['Show', day_tag(day)], local=True)
+    return [(day, found[day]) for day in days]
@@ -0,0 +1,337 @@
+import functools
+import hmac
+import json
+from flask import (
+    Blueprint,
+    Response,
+    jsonify,
+    request,
+    abort,
+    url_for,
+    current_app,
+    stream_with_context
+)
+from sqlalchemy import tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Artist, Venue, Show, live_shows
+import deletion
+import agenda
+from pagination import (
+    encode_cursor,
+    decode_cursor,
+    parse_datetime,
+    get_limit,
+    get_datetime_arg
+)
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# rows streamed per server-side cursor fetch by the NDJSON export
+EXPORT_BATCH = 1000
+# ids per bulk delete request
+DELETE_MAX_IDS = 1000
+
+#----------------------------------------------------------------------------#
+# Fields.
+#----------------------------------------------------------------------------#
+# Every resource selects only the columns asked for with ?fields=a,b,c
+# (sparse fieldsets) and returns plain dicts, no ORM objects are built.
+
+ARTIST_FIELDS = {
+    'id': Artist.id,
+    'name': Artist.name,
+    'city': Artist.city,
+    'state': Artist.state,
+    'phone': Artist.phone,
+    'genres': Artist.genres,
+    'image_link': Artist.image_link,
+    'facebook_link': Artist.facebook_link,
+    'website': Artist.website,
+    'seeking_venue': Artist.seeking_venue,
+    'seeking_description': Artist.seeking_description,
+    'upcoming_shows_count': Artist.upcoming_shows_count,
+    'past_shows_count': Artist.past_shows_count,
+}
+
+VENUE_FIELDS = {
+    'id': Venue.id,
+    'name': Venue.name,
+    'city': Venue.city,
+    'state': Venue.state,
+    'address': Venue.address,
+    'phone': Venue.phone,
+    'genres': Venue.genres,
+    'image_link': Venue.image_link,
+    'facebook_link': Venue.facebook_link,
+    'website': Venue.website,
+    'seeking_talent': Venue.seeking_talent,
+    'seeking_description': Venue.seeking_description,
+    'upcoming_shows_count': Venue.upcoming_shows_count,
+    'past_shows_count': Venue.past_shows_count,
+}
+
+SHOW_FIELDS = {
+    'artist_id': Show.artist_id,
+    'venue_id': Show.venue_id,
+    'start_time': Show.start_time,
+    'duration': Show.duration,
+    'artist_name': Artist.name,
+    'artist_image_link': Artist.image_link,
+    'venue_name': Venue.name,
+    'venue_image_link': Venue.image_link,
+}
+
+
+def get_fields(available):
+    # the requested subset of `available` (all of it by default), in order
+    fields = request.args.get('fields')
+    if not fields:
+        return list(available)
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    if not names or any(name not in available for name in names):
+        abort(400)
+    return names
+
+
+def to_json(names, row):
+    return {
+        name: value.isoformat() if hasattr(value, 'isoformat') else value
+        for name, value in zip(names, row)
+    }
+
+
+def select(available, names, keys):
+    # the requested columns, followed by the sort key columns under
+    # their own labels (always needed to build the next cursor)
+    columns = [available[name].label(name) for name in names]
+    columns += [key.label('_key%d' % i) for i, key in enumerate(keys)]
+    return db.session.query(*columns)
+
+
+def page(query, names, keys, types, endpoint, **values):
+    # keyset pagination on `keys`, ascending
+    limit = get_limit()
+    cursor = request.args.get('cursor')
+    if cursor:
+        query = query.filter(
+            tuple_(*keys) > decode_cursor(cursor, *types))
+    rows = query.order_by(*keys).limit(limit + 1).all()
+
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        args = request.args.to_dict()
+        args['cursor'] = encode_cursor(*rows[-1][len(names):])
+        next_url = url_for(endpoint, **dict(values, **args))
+
+    return jsonify({
+        'data': [to_json(names, row) for row in rows],
+        'next': next_url
+    })
+
+
+def show_query(names, keys=()):
+    # joins artist / venue only when one of their columns is requested
+    query = select(SHOW_FIELDS, names, keys).select_from(Show).\
+        filter(live_shows())
+    if any(SHOW_FIELDS[name].class_ is Artist for name in names):
+        query = query.join(Artist, Show.artist_id == Artist.id)
+    if any(SHOW_FIELDS[name].class_ is Venue for name in names):
+        query = query.join(Venue, Show.venue_id == Venue.id)
+    return query
+
+
+#----------------------------------------------------------------------------#
+# Errors.
+#----------------------------------------------------------------------------#
+
+@api.errorhandler(400)
+def bad_request(error):
+    return jsonify({'error': 400, 'message': 'bad request'}), 400
+
+
+@api.errorhandler(401)
+def unauthorized(error):
+    return jsonify({'error': 401, 'message': 'unauthorized'}), 401, {
+        'WWW-Authenticate': 'Bearer'}
+
+
+@api.errorhandler(404)
+def not_found(error):
+    return jsonify({'error': 404, 'message': 'not found'}), 404
+
+
+@api.errorhandler(500)
+def server_error(error):
+    return jsonify({'error': 500, 'message': 'server error'}), 500
+
+
+#----------------------------------------------------------------------------#
+# Admin routes.
+#----------------------------------------------------------------------------#
+# Routes that are not part of the site (the bulk deletes, the export of the
+# whole show table) need the header Authorization: Bearer <ADMIN_API_TOKEN>,
+# and don't exist (404) when no token is configured. Browsers never send the header on their own, so a
+# cross-site request can't make use of it either.
+
+def admin_only(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config['ADMIN_API_TOKEN']
+        if not token:
+            abort(404)
+        expected = 'Bearer ' + token
+        if not hmac.compare_digest(
+                request.headers.get('Authorization', '').encode(),
+                expected.encode()):
+            abort(401)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def bulk_delete(model):
+    # {"ids": [1, 2, 3], "soft": false}, see deletion.py
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400)
+    ids = body.get('ids')
+    soft = body.get('soft', False)
+    if not isinstance(ids, list) or not 0 < len(ids) <= DELETE_MAX_IDS or \
+            not all(type(id) is int for id in ids) or \
+            not isinstance(soft, bool):
+        abort(400)
+    try:
+        deleted, shows = deletion.delete(model, ids, soft=soft)
+    except SQLAlchemyError:
+        db.session.rollback()
+        current_app.logger.exception(
+            'could not delete %d %s rows', len(ids), model.__name__)
+        abort(500)
+    return jsonify({'data': {'deleted': deleted, 'shows': shows,
+                             'soft': soft}})
+
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+@api.route('/artists')
+def list_artists():
+    names = get_fields(ARTIST_FIELDS)
+    query = select(ARTIST_FIELDS, names, [Artist.id]).\
+        filter(Artist.deleted_at.is_(None))
+    return page(query, names, [Artist.id], [int], 'api.list_artists')
+
+
+@api.route('/artists/<int:artist_id>')
+def get_artist(artist_id):
+    names = get_fields(ARTIST_FIELDS)
+    row = select(ARTIST_FIELDS, names, []).\
+        filter(Artist.id == artist_id, Artist.deleted_at.is_(None)).first()
+    if row is None:
+        abort(404)
+    return jsonify({'data': to_json(names, row)})
+
+
+@api.route('/artists/delete', methods=['POST'])
+@admin_only
+def delete_artists():
+    return bulk_delete(Artist)
+
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+@api.route('/venues')
+def list_venues():
+    names = get_fields(VENUE_FIELDS)
+    query = select(VENUE_FIELDS, names, [Venue.id]).\
+        filter(Venue.deleted_at.is_(None))
+    return page(query, names, [Venue.id], [int], 'api.list_venues')
+
+
+@api.route('/venues/<int:venue_id>')
+def get_venue(venue_id):
+    names = get_fields(VENUE_FIELDS)
+    row = select(VENUE_FIELDS, names, []).\
+        filter(Venue.id == venue_id, Venue.deleted_at.is_(None)).first()
+    if row is None:
+        abort(404)
+    return jsonify({'data': to_json(names, row)})
+
+
+@api.route('/venues/delete', methods=['POST'])
+@admin_only
+def delete_venues():
+    return bulk_delete(Venue)
+
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+@api.route('/shows')
+def list_shows():
+    # ordered by (start_time, artist_id), optionally within ?from= / ?to=
+    names = get_fields(SHOW_FIELDS)
+    keys = [Show.start_time, Show.artist_id]
+    query = show_query(names, keys)
+    date_from = get_datetime_arg('from')
+    date_to = get_datetime_arg('to')
+    if date_from is not None:
+        query = query.filter(Show.start_time >= date_from)
+    if date_to is not None:
+        query = query.filter(Show.start_time < date_to)
+    return page(query, names, keys, [parse_datetime, int], 'api.list_shows')
+
+
+@api.route('/shows/calendar')
+def shows_calendar():
+    # the JSON twin of /shows/calendar, the cached day buckets are written
+    # out as they are (see agenda.py)
+    start, end, city, genre = agenda.window()
+    buckets = agenda.buckets(start, end, city, genre)
+    body = '{"data": [%s]}' % ', '.join(
+        '{"date": "%s", "shows": %s}' % (day.isoformat(), bucket)
+        for day, bucket in buckets)
+    return Response(body, mimetype='application/json')
+
+
+@api.route('/shows/<int:artist_id>/<start_time>')
+def get_show(artist_id, start_time):
+    # a show is identified by its primary key (artist_id, start_time)
+    try:
+        start_time = parse_datetime(start_time)
+    except ValueError:
+        abort(400)
+    names = get_fields(SHOW_FIELDS)
+    row = show_query(names).filter(
+        Show.artist_id == artist_id,
+        Show.start_time == start_time
+    ).first()
+    if row is None:
+        abort(404)
+    return jsonify({'data': to_json(names, row)})
+
+
+#----------------------------------------------------------------------------#
+# Export.
+#----------------------------------------------------------------------------#
+
+@api.route('/export/shows.ndjson')
+@admin_only
+def export_shows():
+    # every show, one JSON document per line, read through a server-side
+    # cursor in batches of EXPORT_BATCH so the table is never held in memory
+    names = get_fields(SHOW_FIELDS)
+    query = show_query(names).\
+        order_by(Show.start_time, Show.artist_id).\
+        yield_per(EXPORT_BATCH)
+
+    def generate():
+        for row in query:
+            yield json.dumps(to_json(names, row)) + '\n'
+
+    return Response(stream_with_context(generate()),
+                    mimetype='application/x-ndjson')
@@ -2,33 +2,58 @@
 # Imports
 #----------------------------------------------------------------------------#
 
+# Only what every worker needs is imported here: babel and dateutil are
+# imported by the first date they format or parse, alembic by `flask db`
+# (see benchmarks/bench_importtime.py).
+import click
 import json
-import dateutil.parser
-import babel
+from functools import lru_cache
 from flask import (
+    Blueprint,
     Flask,
+    current_app,
     render_template,
     request,
-    Response,
     flash,
     redirect,
     url_for,
-    abort
+    abort,
+    jsonify
 )
-from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
+import jinja2
 import logging
 from logging import Formatter, FileHandler
-from flask_wtf import Form
-from forms import *
-from flask_migrate import Migrate
-from config import *
-import sys
-from sqlalchemy.ext.declarative import declarative_base
+from forms import ArtistForm, VenueForm, ShowForm, genres_choices
+from config import config as default_config, profiles
 import datetime
-from models import app, db, Venue, Artist, Show
-
-Base = declarative_base()
+from models import db, Venue, Artist, Show, live_shows
+from sqlalchemy import tuple_, and_
+from sqlalchemy.exc import SQLAlchemyError
+from itertools import groupby
+from pagination import (
+    encode_cursor,
+    decode_cursor,
+    parse_datetime,
+    get_limit,
+    get_datetime_arg,
+    alphabetical_query,
+    alphabetical_page,
+    LETTERS
+)
+from search import search, has_genre
+from api import api
+from importer import import_command
+import counters
+import deletion
+import scheduling
+import agenda
+import availability
+import conditional
+import assets
+from fragments import fragment_cache
+import health
+import instrumentation
+import metrics
 
 
 #----------------------------------------------------------------------------#
@@ -36,13 +61,68 @@ Base = declarative_base()
 #----------------------------------------------------------------------------#
 
 
-moment = Moment(app)
-app.config.from_object('config')
-db.init_app(app)
-
-# TODO: connect to a local postgresql database
-app.config['SQLALCHEMY_DATABASE_URI'] = SQLALCHEMY_DATABASE_URI
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+main = Blueprint('main', __name__)
+
+
+def create_app(config=None):
+    """
+    The application, configured from `config`: a config class or the name of
+    a profile of config.py, FYYUR_ENV by default.
+    """
+    if isinstance(config, str):
+        config = profiles[config]
+    app = Flask(__name__)
+    app.config.from_object(config or default_config)
+    if not app.config.get('SECRET_KEY'):
+        # every worker process must sign sessions with the same key
+        raise RuntimeError('SECRET_KEY is not set')
+
+    health.init_app(app)
+    instrumentation.init_app(app)
+    metrics.init_app(app)
+    # before conditional and fragment_cache, whose keys cover the bundles
+    assets.init_app(app)
+    conditional.init_app(app)
+    fragment_cache.init_app(app)
+    db.init_app(app)
+    if click.get_current_context(silent=True) is not None:
+        # created by the flask command, which may be `flask db`
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    app.register_blueprint(main)
+    app.register_blueprint(api)
+    app.cli.add_command(import_command)
+    app.cli.add_command(counters.counters_command)
+    app.cli.add_command(deletion.delete_command)
+    app.cli.add_command(deletion.purge_command)
+
+    if app.config['JINJA_BYTECODE_CACHE']:
+        # compiled templates, shared by the workers and kept across restarts
+        app.jinja_env.bytecode_cache = jinja2.FileSystemBytecodeCache(
+            app.config['JINJA_BYTECODE_CACHE_DIR'], 'fyyur-%s.cache')
+    if app.config['TEMPLATE_WARMUP']:
+        warm_up(app)
+
+    if not app.debug and not app.testing:
+        file_handler = FileHandler('error.log')
+        file_handler.setFormatter(
+            Formatter(
+                '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+        )
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info('errors')
+    return app
+
+
+def warm_up(app):
+    # compiles every template under templates/ and loads the date formatting
+    # data, so that (with gunicorn's preload_app) the workers fork with them
+    # instead of each paying for them on its first requests
+    for name in app.jinja_loader.list_templates():
+        app.jinja_env.get_template(name)
+    format_datetime(datetime.datetime.now(), 'full')
 
 
 ############################################################################
@@ -53,23 +133,40 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 #----------------------------------------------------------------------------#
 
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format):
+    # compiled babel pattern, shared by every render using that format
+    import babel.dates
+    return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format))
 
 
-app.jinja_env.filters['datetime'] = format_datetime
+@lru_cache(maxsize=None)
+def datetime_locale(locale):
+    import babel.dates
+    return babel.Locale.parse(locale or babel.dates.LC_TIME)
+
+
+@main.app_template_filter('datetime')
+def format_datetime(value, format='medium', locale=None):
+    # views pass datetime objects, strings are still accepted
+    if isinstance(value, str):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    return datetime_pattern(format).apply(value, datetime_locale(locale))
+
 
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
 
-@app.route('/')
+@main.route('/')
 def index():
     return render_template('pages/home.html')
 
@@ -77,79 +174,140 @@ def index():
 #  Venues
 #  ----------------------------------------------------------------
 
-@app.route('/venues')
+@main.route('/venues')
 def venues():
+    # one page of areas (city, state), optionally restricted with ?state=
+    # the areas of the page are picked by a grouped subquery and their venues
+    # are fetched in the same statement, ordered so they can be grouped in
+    # a single pass below
+    limit = get_limit()
+    state = request.args.get('state')
+
+    areas = db.session.query(Venue.state, Venue.city).\
+        filter(Venue.deleted_at.is_(None)).\
+        group_by(Venue.state, Venue.city)
+    if state:
+        areas = areas.filter(Venue.state == state)
+    cursor = request.args.get('cursor')
+    if cursor:
+        after_state, after_city = decode_cursor(cursor, str, str)
+        areas = areas.filter(
+            tuple_(Venue.state, Venue.city) > (after_state, after_city))
+    areas = areas.order_by(Venue.state, Venue.city).\
+        limit(limit + 1).subquery()
+
+    query = db.session.query(
+        Venue.id, Venue.name, Venue.city, Venue.state
+    ).join(areas, and_(
+        Venue.city == areas.c.city,
+        Venue.state == areas.c.state
+    )).filter(Venue.deleted_at.is_(None))
+    response = conditional.not_modified(conditional.page_validators(
+        query, [Venue.id], [Venue.updated_at]))
+    if response is not None:
+        return response
+    rows = query.order_by(Venue.state, Venue.city, Venue.name, Venue.id).all()
+
     locals = []
-    venues = Venue.query.all()
-    for place in Venue.query.distinct(Venue.city, Venue.state).all():
+    for (city, state), venues in groupby(rows, key=lambda r: (r.city, r.state)):
         locals.append({
-            'city': place.city,
-            'state': place.state,
+            'city': city,
+            'state': state,
             'venues': [{
                 'id': venue.id,
                 'name': venue.name,
-            } for venue in venues if
-                venue.city == place.city and venue.state == place.state]
+            } for venue in venues]
         })
-    return render_template('pages/venues.html', areas=locals)
 
+    next_url = None
+    if len(locals) > limit:
+        locals = locals[:limit]
+        last = locals[-1]
+        args = request.args.to_dict()
+        args['cursor'] = encode_cursor(last['state'], last['city'])
+        next_url = url_for('.venues', **args)
 
-@app.route('/venues/search', methods=['POST'])
+    return render_template('pages/venues.html', areas=locals, next_url=next_url)
+
+
+@main.route('/venues/search', methods=['GET', 'POST'])
 def search_venues():
-    # TODO: implement search on venues with partial string search. Ensure it is case-insensitive.
-    # seach for Hop should return "The Musical Hop".
-    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
-
-    search_term = request.form.get('search_term', '')
-    results = Venue.query.filter(Venue.name.ilike('%'+search_term+'%'))
-    count = 0
-    data = []
-    for v in results:
-        count += 1
-        shows = v.artists    # get all_shows
-        upcoming_shows_count = 0
-        for s in shows:
-            if s.start_time > datetime.datetime.now():  # to get num_upcoming_shows
-                upcoming_shows_count += 1
-        v_info = {
-            "id": v.id,
-            "name": v.name,
-            "num_upcoming_shows": upcoming_shows_count
-        }
-        data.append(v_info)
+    # case-insensitive partial match on the venue name or city, ranked,
+    # paginated with ?page= (the pager links are GETs carrying search_term)
+    search_term = request.values.get('search_term', '')
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = get_limit()
 
+    count, results = search(Venue, search_term, page, per_page)
     response = {
         "count": count,
-        "data": data
+        "data": [{
+            "id": v.id,
+            "name": v.name,
+            "num_upcoming_shows": v.num_upcoming_shows
+        } for v in results]
     }
-    return render_template('pages/search_venues.html', results=response, search_term=search_term)
-
-
-@app.route('/venues/<int:venue_id>')
+    next_url = None
+    if page * per_page < count:
+        next_url = url_for('.search_venues', search_term=search_term,
+                           page=page + 1, limit=per_page)
+    not_modified = conditional.not_modified((response, next_url))
+    if not_modified is not None:
+        return not_modified
+    return render_template('pages/search_venues.html', results=response,
+                           search_term=search_term, next_url=next_url)
+
+
+@main.route('/venues/<int:venue_id>')
 def show_venue(venue_id):
     # shows the venue page with the given venue_id
-    # TODO: replace with real venue data from the venues table, using venue_id
-
-    past_shows = db.session.query(Artist, Show).join(Show).join(Venue).\
-        filter(
-        Show.venue_id == venue_id,
-        Show.artist_id == Artist.id,
-        Show.start_time < datetime.datetime.now()
-    ).all()
-
-    upcoming_shows = db.session.query(Artist, Show).join(Show).join(Venue).\
-        filter(
-        Show.venue_id == venue_id,
-        Show.artist_id == Artist.id,
-        Show.start_time > datetime.datetime.now()
-    ).all()
-
-    venue = Venue.query.filter_by(id=venue_id).first_or_404()
+    # a 304 if the client's copy is current, see conditional.py
+    validators = conditional.detail_validators(
+        Venue, venue_id, Show.venue_id, Artist, Show.artist_id)
+    if validators is None:
+        abort(404)
+    response = conditional.not_modified(validators)
+    if response is not None:
+        return response
+
+    # the venue and all of its shows (with their artists) come from a single
+    # statement ordered by start_time, then split into past / upcoming
+    rows = db.session.query(
+        Venue,
+        Show.start_time,
+        Artist.id,
+        Artist.name,
+        Artist.image_link
+    ).select_from(Venue).\
+        outerjoin(Show, and_(Show.venue_id == Venue.id, live_shows())).\
+        outerjoin(Artist, Show.artist_id == Artist.id).\
+        filter(Venue.id == venue_id, Venue.deleted_at.is_(None)).\
+        order_by(Show.start_time).all()
+    if not rows:
+        abort(404)
+
+    venue = rows[0][0]
+    now = datetime.datetime.now()
+    past_shows = []
+    upcoming_shows = []
+    for _, start_time, artist_id, artist_name, artist_image_link in rows:
+        if start_time is None:  # venue without shows
+            continue
+        show = {
+            "artist_id": artist_id,
+            "artist_name": artist_name,
+            "artist_image_link": artist_image_link,
+            "start_time": start_time
+        }
+        if start_time > now:
+            upcoming_shows.append(show)
+        else:
+            past_shows.append(show)
 
     data = {
         "id": venue.id,
         "name": venue.name,
-        "genres": [],
+        "genres": venue.genres or [],
         "address": venue.address,
         "city": venue.city,
         "state": venue.state,
@@ -159,45 +317,76 @@ def show_venue(venue_id):
         "seeking_talent": venue.seeking_talent,
         # "seeking_description": required_venue.seeking_description,
         "image_link": venue.image_link,
-        "past_shows": [{
-            "artist_id": artist.id,
-            "artist_name": artist.name,
-            "artist_image_link": artist.image_link,
-            "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M")
-        } for artist, show in past_shows],
-        "upcoming_shows": [{
-            "artist_id": artist.id,
-            "artist_name": artist.name,
-            "artist_image_link": artist.image_link,
-            "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M")
-        } for artist, show in upcoming_shows],
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
         "past_shows_count": len(past_shows),
         "upcoming_shows_count": len(upcoming_shows)
     }
 
-    # from {g1,g2,..} to ["g1", "g2", ...]
-    genres = venue.genres
-    genres = genres[1:]  # Removing the fist character
-    genres = genres[:-1]  # Removing the last character
-    genres = genres.split(',')
-    data["genres"] = genres
 
     if venue.seeking_talent:  # to add seeking_description
         data["seeking_description"] = venue.seeking_description
 
     return render_template('pages/show_venue.html', venue=data)
 
+
+@main.route('/venues/<int:venue_id>/availability')
+def venue_availability(venue_id):
+    # booked and free slots of a venue between ?from= and ?to= (ISO 8601, the
+    # next 30 days by default), and with ?start_time= (and ?duration=, in
+    # minutes) what that show would overlap. See availability.py
+    listed = db.session.query(Venue.id).\
+        filter(Venue.id == venue_id, Venue.deleted_at.is_(None)).scalar()
+    if listed is None:
+        abort(404)
+    start = get_datetime_arg('from') or datetime.datetime.now()
+    if not availability.EARLIEST <= start <= availability.LATEST_WINDOW:
+        abort(400)
+    end = get_datetime_arg('to') or start + datetime.timedelta(days=30)
+    if not start < end <= start + availability.MAX_WINDOW:
+        abort(400)
+    slots = availability.booked(venue_id, start, end)
+    data = {
+        'venue_id': venue_id,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'booked': [{
+            'start_time': slot_start.isoformat(),
+            'end_time': slot_end.isoformat(),
+            'artist_ids': artist_ids,
+        } for slot_start, slot_end, artist_ids in slots],
+        'free': [{
+            'start_time': gap_start.isoformat(),
+            'end_time': gap_end.isoformat(),
+        } for gap_start, gap_end in availability.free(slots, start, end)],
+    }
+    proposed = get_datetime_arg('start_time')
+    if proposed is not None:
+        duration = request.args.get(
+            'duration', availability.DEFAULT_DURATION, type=int)
+        if not 0 < duration <= availability.MAX_DURATION.total_seconds() / 60:
+            abort(400)
+        if not availability.EARLIEST <= proposed <= availability.LATEST_SHOW:
+            abort(400)
+        clashes = availability.conflicts(venue_id, [(proposed, duration)])
+        data['conflicts'] = [{
+            'start_time': slot_start.isoformat(),
+            'end_time': slot_end.isoformat(),
+            'artist_ids': artist_ids,
+        } for slot_start, slot_end, artist_ids in clashes.get(proposed, [])]
+    return jsonify({'data': data})
+
 #  Create Venue
 #  ----------------------------------------------------------------
 
 
-@app.route('/venues/create', methods=['GET'])
+@main.route('/venues/create', methods=['GET'])
 def create_venue_form():
     form = VenueForm()
     return render_template('forms/new_venue.html', form=form)
 
 
-@app.route('/venues/create', methods=['POST'])
+@main.route('/venues/create', methods=['POST'])
 def create_venue_submission():
     # TODO: insert form data as a new Venue record in the db, instead
     # TODO: modify data to be the data object returned from db insertion
@@ -217,9 +406,10 @@ def create_venue_submission():
             db.session.commit()
             flash('Venue ' + request.form['name']
                   + ' was successfully listed!')
-        except ValueError as e:
+        except ValueError:
             db.session.rollback()
-            print(e)
+            current_app.logger.exception('could not list venue %r',
+                                         request.form['name'])
             flash('An error occurred. Venue ' +
                   request.form['name'] + ' could not be listed.')
             error = True
@@ -227,7 +417,7 @@ def create_venue_submission():
             db.session.close()
 
         if error:
-            return redirect(url_for('create_venue_submission'))
+            return redirect(url_for('.create_venue_submission'))
         else:
             # return render_template('pages/home.html')
             # redirect to the home page
@@ -237,146 +427,141 @@ def create_venue_submission():
         for field, err in form.errors.items():
             message.append(field + ' ' + '|'.join(err))
         flash('Errors ' + str(message))
-        return redirect(url_for('create_venue_submission'))
+        return redirect(url_for('.create_venue_submission'))
 
 
-@ app.route('/venues/<venue_id>/delete', methods=['DELETE'])
+@main.route('/venues/<int:venue_id>/delete', methods=['DELETE'])
 def delete_venue(venue_id):
-    # TODO: Complete this endpoint for taking a venue_id, and using
-    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
-
-    # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
-    # clicking that button delete it from the db then redirect the user to the homepage
-    error = False
-    name = ""
-    try:
-        venue = Venue.query.get(venue_id)
-        name = venue.name
-        all_shows = Show.query.filter_by(venue_id=venue_id)
-        all_shows.delete()
-        # db.session.commit()
-        db.session.delete(venue)
-        db.session.commit()
-        # on successful db insert, flash success
-        flash('Venue ' + name + ' was successfully deleted!')
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info)
-    finally:
-        db.session.close()
-    if error:
-        flash('An error occurred. Venue ' + name + ' could not be deleted.')
-        abort(500)
-    else:
-        return render_template('pages/home.html')
+    # the venue and its shows (ON DELETE CASCADE), see deletion.py;
+    # many at once: POST /api/v1/venues/delete or `flask delete venues`
+    return delete_one(Venue, venue_id)
 
 
-@ app.route('/artists/<int:artist_id>/delete', methods=['DELETE'])
+@main.route('/artists/<int:artist_id>/delete', methods=['DELETE'])
 def delete_artist(artist_id):
-    # TODO: Complete this endpoint for taking a artist_id, and using
-    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+    return delete_one(Artist, artist_id)
 
-    # BONUS CHALLENGE: Implement a button to delete a Artist on a Artist Page, have it so that
-    # clicking that button delete it from the db then redirect the user to the homepage
-    error = False
-    name = ""
+
+def delete_one(model, id):
+    name = db.session.query(model.name).\
+        filter(model.id == id, model.deleted_at.is_(None)).scalar()
+    if name is None:
+        abort(404)
     try:
-        artist = Artist.query.get(artist_id)
-        name = artist.name
-        all_shows = Show.query.filter_by(artist_id=artist_id)
-        all_shows.delete()
-        # db.session.commit()
-        db.session.delete(artist)
-        db.session.commit()
-        # on successful db insert, flash success
-        flash('Artist ' + name + ' was successfully deleted!')
-    except:
+        deletion.delete(model, [id])
+    except SQLAlchemyError:
         db.session.rollback()
-        error = True
-        print(sys.exc_info)
-    finally:
-        db.session.close()
-    if error:
-        flash('An error occurred. Artist ' + name + ' could not be deleted.')
+        current_app.logger.exception(
+            'could not delete %s %d', model.__name__, id)
+        flash('An error occurred. %s %s could not be deleted.' % (
+            model.__name__, name))
         abort(500)
-    else:
-        return render_template('pages/home.html')
+    flash('%s %s was successfully deleted!' % (model.__name__, name))
+    return render_template('pages/home.html')
 
 
 #  Artists
 #  ----------------------------------------------------------------
 
 
-@ app.route('/artists')
+@main.route('/artists')
 def artists():
-    # TODO: replace with real data returned from querying the database
-    data = []
-    artists = Artist.query.all()
-    for a in artists:
-        x = {
-            "id": a.id,
-            "name": a.name
-        }
-        data.append(x)
-    return render_template('pages/artists.html', artists=data)
-
-
-@ app.route('/artists/search', methods=['POST'])
+    # one page of artists by name, id and name columns only (no ORM
+    # objects), see alphabetical_query()
+    query = alphabetical_query(db.session.query(Artist.id, Artist.name).
+                               filter(Artist.deleted_at.is_(None)),
+                               Artist.name, Artist.id)
+    response = conditional.not_modified(conditional.page_validators(
+        query, [Artist.id], [Artist.updated_at]))
+    if response is not None:
+        return response
+    rows, next_url = alphabetical_page(query.all(), '.artists')
+    data = [{
+        "id": id,
+        "name": name
+    } for id, name in rows]
+    return render_template('pages/artists.html', artists=data,
+                           letters=LETTERS, next_url=next_url)
+
+
+@main.route('/artists/search', methods=['GET', 'POST'])
 def search_artists():
-    # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-    # search for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
-    # search for "band" should return "The Wild Sax Band".
-
-    search_term = request.form.get('search_term', '')
-    results = Artist.query.filter(Artist.name.ilike('%'+search_term+'%'))
-    count = 0
-    data = []
-    for a in results:
-        count += 1
-        shows = a.venues    # get all_shows
-        upcoming_shows_count = 0
-        for s in shows:
-            if s.start_time > datetime.datetime.now():  # to get num_upcoming_shows
-                upcoming_shows_count += 1
-        a_info = {
-            "id": a.id,
-            "name": a.name,
-            "num_upcoming_shows": upcoming_shows_count
-        }
-        data.append(a_info)
+    # case-insensitive partial match on the artist name or city, ranked,
+    # paginated with ?page= (the pager links are GETs carrying search_term)
+    search_term = request.values.get('search_term', '')
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = get_limit()
 
+    count, results = search(Artist, search_term, page, per_page)
     response = {
         "count": count,
-        "data": data
+        "data": [{
+            "id": a.id,
+            "name": a.name,
+            "num_upcoming_shows": a.num_upcoming_shows
+        } for a in results]
     }
-    return render_template('pages/search_artists.html', results=response, search_term=search_term)
-
-
-@ app.route('/artists/<int:artist_id>')
+    next_url = None
+    if page * per_page < count:
+        next_url = url_for('.search_artists', search_term=search_term,
+                           page=page + 1, limit=per_page)
+    not_modified = conditional.not_modified((response, next_url))
+    if not_modified is not None:
+        return not_modified
+    return render_template('pages/search_artists.html', results=response,
+                           search_term=search_term, next_url=next_url)
+
+
+@main.route('/artists/<int:artist_id>')
 def show_artist(artist_id):
     # shows the artist page with the given artist_id
-    # TODO: replace with real artist data from the artists table, using artist_id
-
-    past_shows = db.session.query(Venue, Show).join(Show).join(Artist).\
-        filter(
-        Show.artist_id == artist_id,
-        Show.venue_id == Venue.id,
-        Show.start_time < datetime.datetime.now()
-    ).all()
-
-    upcoming_shows = db.session.query(Venue, Show).join(Show).join(Artist).\
-        filter(
-        Show.artist_id == artist_id,
-        Show.venue_id == Venue.id,
-        Show.start_time > datetime.datetime.now()
-    ).all()
-
-    artist = Artist.query.filter_by(id=artist_id).first_or_404()
+    # a 304 if the client's copy is current, see conditional.py
+    validators = conditional.detail_validators(
+        Artist, artist_id, Show.artist_id, Venue, Show.venue_id)
+    if validators is None:
+        abort(404)
+    response = conditional.not_modified(validators)
+    if response is not None:
+        return response
+
+    # the artist and all of its shows (with their venues) come from a single
+    # statement ordered by start_time, then split into past / upcoming
+    rows = db.session.query(
+        Artist,
+        Show.start_time,
+        Venue.id,
+        Venue.name,
+        Venue.image_link
+    ).select_from(Artist).\
+        outerjoin(Show, and_(Show.artist_id == Artist.id, live_shows())).\
+        outerjoin(Venue, Show.venue_id == Venue.id).\
+        filter(Artist.id == artist_id, Artist.deleted_at.is_(None)).\
+        order_by(Show.start_time).all()
+    if not rows:
+        abort(404)
+
+    artist = rows[0][0]
+    now = datetime.datetime.now()
+    past_shows = []
+    upcoming_shows = []
+    for _, start_time, venue_id, venue_name, venue_image_link in rows:
+        if start_time is None:  # artist without shows
+            continue
+        show = {
+            "venue_id": venue_id,
+            "venue_name": venue_name,
+            "venue_image_link": venue_image_link,
+            "start_time": start_time
+        }
+        if start_time > now:
+            upcoming_shows.append(show)
+        else:
+            past_shows.append(show)
+
     data = {
         "id": artist.id,
         "name": artist.name,
-        "genres": [],
+        "genres": artist.genres or [],
         "city": artist.city,
         "state": artist.state,
         "phone": artist.phone,
@@ -385,27 +570,11 @@ def show_artist(artist_id):
         "seeking_venue": artist.seeking_venue,
         # "seeking_description": required_artist.seeking_description,
         "image_link": artist.image_link,
-        "past_shows": [{
-            "venue_id": venue.id,
-            "venue_name": venue.name,
-            "venue_image_link": venue.image_link,
-            "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M")
-        } for venue, show in past_shows],
-        "upcoming_shows": [{
-            "venue_id": venue.id,
-            "venue_name": venue.name,
-            "venue_image_link": venue.image_link,
-            "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M")
-        } for venue, show in upcoming_shows],
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
         "past_shows_count": len(past_shows),
         "upcoming_shows_count": len(upcoming_shows)
     }
-    # from {g1,g2,..} to ["g1", "g2", ...]
-    genres = artist.genres
-    genres = genres[1:]  # Removing the fist character
-    genres = genres[:-1]  # Removing the last character
-    genres = genres.split(',')
-    data["genres"] = genres
 
     if artist.seeking_venue:  # to add seeking_description
         data["seeking_description"] = artist.seeking_description
@@ -413,10 +582,39 @@ def show_artist(artist_id):
     return render_template('pages/show_artist.html', artist=data)
 
 
+#  Genres
+#  ----------------------------------------------------------------
+
+@main.route('/genres/<genre>/<any(artists, venues):kind>')
+def browse_genre(genre, kind):
+    # artists or venues listing the given genre, served by the GIN index
+    # on genres and paged by name, see alphabetical_query()
+    if genre not in dict(genres_choices):
+        abort(404)
+    model = Artist if kind == 'artists' else Venue
+
+    query = alphabetical_query(db.session.query(model.id, model.name).filter(
+        has_genre(model.genres, genre), model.deleted_at.is_(None)),
+        model.name, model.id)
+    response = conditional.not_modified(conditional.page_validators(
+        query, [model.id], [model.updated_at]))
+    if response is not None:
+        return response
+    rows, next_url = alphabetical_page(query.all(), '.browse_genre',
+                                       genre=genre, kind=kind)
+
+    data = [{
+        "id": id,
+        "name": name
+    } for id, name in rows]
+    return render_template('pages/genre.html', genre=genre, kind=kind,
+                           items=data, letters=LETTERS, next_url=next_url)
+
+
 #  Update
 #  ----------------------------------------------------------------
 
-@ app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@main.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
     form = ArtistForm()
     artist = Artist.query.get(artist_id)
@@ -424,7 +622,7 @@ def edit_artist(artist_id):
     return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 
-@ app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@main.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
 
     # TODO: take values from the form submitted, and update existing
@@ -434,20 +632,19 @@ def edit_artist_submission(artist_id):
     # When you validate with FlaskForm.validate, it is necessary to also provideCSRF
     # protection in the forms of the views. To avoid having to implement CSRF inviews,
     # use the attribute: meta={'csrf': False}:
-    print('1111111111111111111111111111111111')
     form = ArtistForm(request.form, meta={'csrf': False})
     if form.validate():
         error = False
         try:
-            print('eeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeewwwww')
             artist = Artist.query.get_or_404(artist_id)
             form.populate_obj(artist)
             db.session.commit()
             flash('Artist ' + request.form['name']
                   + ' was successfully updated!')
-        except ValueError as e:
+        except ValueError:
             db.session.rollback()
-            print(e)
+            current_app.logger.exception('could not update artist %d',
+                                         artist_id)
             flash('An error occurred. Artist ' +
                   request.form['name'] + ' could not be updated.')
             error = True
@@ -455,18 +652,18 @@ def edit_artist_submission(artist_id):
             db.session.close()
 
         if error:
-            return redirect(url_for('edit_artist_submission', artist_id=artist_id))
+            return redirect(url_for('.edit_artist_submission', artist_id=artist_id))
         else:
-            return redirect(url_for('show_artist', artist_id=artist_id))
+            return redirect(url_for('.show_artist', artist_id=artist_id))
     else:
         message = []
         for field, err in form.errors.items():
             message.append(field + ' ' + '|'.join(err))
         flash('Errors ' + str(message))
-        return redirect(url_for('edit_artist_submission', artist_id=artist_id))
+        return redirect(url_for('.edit_artist_submission', artist_id=artist_id))
 
 
-@ app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@main.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
     form = VenueForm()
     venue = Venue.query.get(venue_id)
@@ -474,7 +671,7 @@ def edit_venue(venue_id):
     return render_template('forms/edit_venue.html', form=form, venue=venue)
 
 
-@ app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@main.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
     # TODO: take values from the form submitted, and update existing
     # venue record with ID <venue_id> using the new attributes
@@ -493,9 +690,10 @@ def edit_venue_submission(venue_id):
             db.session.commit()
             flash('Venue ' + request.form['name']
                   + ' was successfully updated!')
-        except ValueError as e:
+        except ValueError:
             db.session.rollback()
-            print(e)
+            current_app.logger.exception('could not update venue %d',
+                                         venue_id)
             flash('An error occurred. Venue ' +
                   request.form['name'] + ' could not be updated.')
             error = True
@@ -503,28 +701,28 @@ def edit_venue_submission(venue_id):
             db.session.close()
 
         if error:
-            return redirect(url_for('edit_venue_submission', venue_id=venue_id))
+            return redirect(url_for('.edit_venue_submission', venue_id=venue_id))
         else:
-            return redirect(url_for('show_venue', venue_id=venue_id))
+            return redirect(url_for('.show_venue', venue_id=venue_id))
     else:
         message = []
         for field, err in form.errors.items():
             message.append(field + ' ' + '|'.join(err))
         flash('Errors ' + str(message))
-        return redirect(url_for('edit_venue_submission', venue_id=venue_id))
+        return redirect(url_for('.edit_venue_submission', venue_id=venue_id))
 
 
 #  Create Artist
 #  ----------------------------------------------------------------
 
 
-@ app.route('/artists/create', methods=['GET'])
+@main.route('/artists/create', methods=['GET'])
 def create_artist_form():
     form = ArtistForm()
     return render_template('forms/new_artist.html', form=form)
 
 
-@ app.route('/artists/create', methods=['POST'])
+@main.route('/artists/create', methods=['POST'])
 def create_artist_submission():
     # called upon submitting the new artist listing form
     # TODO: insert form data as a new Venue record in the db, instead
@@ -545,9 +743,10 @@ def create_artist_submission():
             db.session.commit()
             flash('Artist ' + request.form['name']
                   + ' was successfully listed!')
-        except ValueError as e:
+        except ValueError:
             db.session.rollback()
-            print(e)
+            current_app.logger.exception('could not list artist %r',
+                                         request.form['name'])
             flash('An error occurred. Artist ' +
                   request.form['name'] + ' could not be listed.')
             error = True
@@ -555,7 +754,7 @@ def create_artist_submission():
             db.session.close()
 
         if error:
-            return redirect(url_for('create_artist_submission'))
+            return redirect(url_for('.create_artist_submission'))
         else:
             # return render_template('pages/home.html')
             # redirect to the home page
@@ -565,112 +764,187 @@ def create_artist_submission():
         for field, err in form.errors.items():
             message.append(field + ' ' + '|'.join(err))
         flash('Errors ' + str(message))
-        return redirect(url_for('create_artist_submission'))
+        return redirect(url_for('.create_artist_submission'))
 
 
 #  Shows
 #  ----------------------------------------------------------------
 
-@ app.route('/shows')
+@main.route('/shows')
 def shows():
-    # displays list of shows at /shows
-    # TODO: replace with real shows data.
-
-    data = []
-    shows = Show.query.all()
-    for s in shows:
-        show_info = {
-            "venue_id": s.venue_id,
-            "venue_name": s.venue.name,
-            "artist_id": s.artist_id,
-            "artist_name": s.artist.name,
-            "artist_image_link": s.artist.image_link,
-            "start_time": s.start_time.strftime("%Y/%m/%d, %H:%M:%S")
-        }
-        data.append(show_info)
-
-    return render_template('pages/shows.html', shows=data)
-
-
-@ app.route('/shows/create')
+    # displays list of shows at /shows, one page at a time
+    # ordered by (start_time, artist_id) which is the primary key of Show,
+    # so ?cursor= continues right after the last show of the previous page
+    limit = get_limit()
+    date_from = get_datetime_arg('from')
+    date_to = get_datetime_arg('to')
+
+    # venue and artist columns come from the same statement (no lazy loads)
+    query = db.session.query(
+        Show.venue_id,
+        Venue.name,
+        Show.artist_id,
+        Artist.name,
+        Artist.image_link,
+        Show.start_time
+    ).join(Venue, Show.venue_id == Venue.id).\
+        join(Artist, Show.artist_id == Artist.id).\
+        filter(live_shows())
+
+    if date_from is not None:
+        query = query.filter(Show.start_time >= date_from)
+    if date_to is not None:
+        query = query.filter(Show.start_time < date_to)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        start_time, artist_id = decode_cursor(cursor, parse_datetime, int)
+        query = query.filter(
+            tuple_(Show.start_time, Show.artist_id) > (start_time, artist_id))
+
+    # one extra row tells us whether there is a next page
+    query = query.order_by(Show.start_time, Show.artist_id).limit(limit + 1)
+    response = conditional.not_modified(conditional.page_validators(
+        query, [Show.artist_id, Show.venue_id, Show.start_time],
+        [Show.updated_at, Venue.updated_at, Artist.updated_at]))
+    if response is not None:
+        return response
+    rows = query.all()
+
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        args = request.args.to_dict()
+        args['cursor'] = encode_cursor(last.start_time, last.artist_id)
+        next_url = url_for('.shows', **args)
+
+    data = [{
+        "venue_id": venue_id,
+        "venue_name": venue_name,
+        "artist_id": artist_id,
+        "artist_name": artist_name,
+        "artist_image_link": artist_image_link,
+        "start_time": start_time
+    } for venue_id, venue_name, artist_id, artist_name, artist_image_link,
+        start_time in rows]
+
+    return render_template('pages/shows.html', shows=data, next_url=next_url)
+
+
+@main.route('/shows/calendar')
+def shows_calendar():
+    # the shows of a window of days, day by day, see agenda.py
+    start, end, city, genre = agenda.window()
+    buckets = agenda.buckets(start, end, city, genre)
+    response = conditional.not_modified(buckets)
+    if response is not None:
+        return response
+
+    days = [{
+        "date": day,
+        "shows": [dict(show, start_time=datetime.datetime.fromisoformat(
+            show['start_time'])) for show in json.loads(bucket)]
+    } for day, bucket in buckets]
+    # no link past the first or the last day there is
+    previous_url = next_url = None
+    earlier, later = agenda.pager(start, end)
+    args = request.args.to_dict()
+    if earlier is not None:
+        args.update({'from': earlier[0].isoformat(),
+                     'to': earlier[1].isoformat()})
+        previous_url = url_for('.shows_calendar', **args)
+    if later is not None:
+        args.update({'from': later[0].isoformat(), 'to': later[1].isoformat()})
+        next_url = url_for('.shows_calendar', **args)
+    return render_template(
+        'pages/calendar.html', days=days, start=start, end=end, city=city,
+        genre=genre, genres=genres_choices, previous_url=previous_url,
+        next_url=next_url)
+
+
+@main.route('/shows/create')
 def create_shows():
     # renders form. do not touch.
     form = ShowForm()
     return render_template('forms/new_show.html', form=form)
 
 
-@ app.route('/shows/create', methods=['POST'])
+@main.route('/shows/create', methods=['POST'])
 def create_show_submission():
     # called to create new shows in the db, upon submitting new show listing form
-    # TODO: insert form data as a new Show record in the db, instead
-
-    error = False
+    # a repeating show lists all its occurrences at once, see scheduling.py
     try:
-        artist_id = request.form['artist_id']
-        venue_id = request.form['venue_id']
-        start_time = request.form['start_time']
-
-        artist = Artist.query.get(artist_id)
-        venue = Venue.query.get(venue_id)
-        if artist == None or venue == None:  # check if artist_id or venue_id doesn't exist
-            raise 'error'
-        show = Show(start_time=start_time, venue=venue, artist=artist)
-        db.session.commit()
-
-        # on successful db insert, flash success
-        flash('Show was successfully listed!')
+        artist_id = int(request.form['artist_id'])
+        venue_id = int(request.form['venue_id'])
+        start_time = parse_datetime(request.form['start_time'])
+        until = request.form.get('repeat_until')
+        until = parse_datetime(until).date() if until else None
+        duration = int(request.form.get('duration') or
+                       availability.DEFAULT_DURATION)
+        if not 0 < duration <= availability.MAX_DURATION.total_seconds() / 60:
+            raise ValueError(duration)
+    except (KeyError, ValueError):
+        flash('An error occurred. Show could not be listed: the ids and the '
+              'duration (up to a day, in minutes) must be numbers and the '
+              'times YYYY-MM-DD HH:MM.')
+        return redirect(url_for('.create_shows'))
 
-    except:
+    try:
+        listed, taken, clashes = scheduling.schedule(
+            artist_id, venue_id, start_time,
+            request.form.get('repeat'), until, duration)
+    except scheduling.ScheduleError as e:
+        flash('Show could not be listed: %s.' % e)
+        return redirect(url_for('.create_shows'))
+    except SQLAlchemyError:
         db.session.rollback()
-        error = True
-        print(sys.exc_info)
-    finally:
-        db.session.close()
-    if error:
-        # TODO: on unsuccessful db insert, flash an error instead.
-        # e.g., flash('An error occurred. Show could not be listed.')
+        current_app.logger.exception('could not list show of artist %d at %s',
+                                     artist_id, start_time)
         flash('An error occurred. Show could not be listed.')
         abort(500)
+    finally:
+        db.session.close()
+
+    # on successful db insert, flash success
+    if len(listed) == 1:
+        flash('Show was successfully listed!')
     else:
-        return redirect('/')  # redirect to the home page
-        # return render_template('pages/home.html')
+        flash('%d shows were successfully listed!' % len(listed))
+    if taken:
+        flash('The artist already has a show at %s, not listed again.' %
+              ', '.join(scheduling.format_time(t) for t in taken))
+    if clashes:
+        flash('The venue is booked at %s, not listed.' %
+              ', '.join(scheduling.format_time(t) for t in sorted(clashes)))
+    return redirect('/')  # redirect to the home page
 
 
 # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
 
 
-@ app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
 
-@ app.errorhandler(500)
+@main.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
-
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
 
-# Default port:
+# Development server only, production runs wsgi.py under gunicorn (see
+# gunicorn.conf.py). Default port:
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
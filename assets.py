@@ -0,0 +1,212 @@
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import click
+from flask import Blueprint, abort, current_app, request, send_file, url_for
+from flask.cli import with_appcontext
+
+try:
+    import brotli
+except ImportError:  # the .br variants are skipped
+    brotli = None
+
+#----------------------------------------------------------------------------#
+# Static asset bundles.
+#----------------------------------------------------------------------------#
+# `flask assets build` concatenates and minifies the stylesheets and scripts
+# of layouts/main.html into one file per bundle, named after its content
+# hash (main.3f2a9c1d0b.css), next to a gzip and a brotli variant (brotli
+# when the Brotli package is installed), in static/dist/, and writes
+# static/dist/manifest.json. Run it on every deploy, before the app starts.
+#
+# asset_urls('main.css') in a template gives the URL of the built bundle:
+# /assets/<hashed name> is served with a one year, immutable Cache-Control
+# (a new build gives new names), as the precompressed variant the client
+# accepts. Nothing is compressed at request time. Without a build (e.g. in
+# development) asset_urls gives the source files, served by /static.
+#
+# Old bundles are kept, so cached pages pointing at them keep working.
+
+BUNDLES = {
+    'main.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    # in <head>, needed while the page is parsed
+    'head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    # deferred, after jQuery
+    'main.js': [
+        'js/script.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+}
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]  # preferred first
+IMMUTABLE = 'public, max-age=31536000, immutable'
+BUILT = re.compile(r'^[\w-]+\.[0-9a-f]{10}\.(css|js)$')
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_SPACE = re.compile(r'\s*([{};,>])\s*')
+# not before a colon: "a :hover" and "a:hover" are different selectors
+CSS_COLON = re.compile(r':\s+')
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+assets = Blueprint('assets', __name__, url_prefix='/assets')
+
+
+#----------------------------------------------------------------------------#
+# Build.
+#----------------------------------------------------------------------------#
+
+def minify_css(css):
+    css = CSS_COMMENT.sub('', css)
+    css = CSS_SPACE.sub(r'\1', ' '.join(css.split()))
+    css = CSS_COLON.sub(':', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js):
+    # conservative: only indentation, blank lines and whole-line // comments
+    # go
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines
+                     if line and not line.startswith('//'))
+
+
+def absolute_urls(css, source, static_url):
+    # url(../fonts/x.woff) in css/... must still point to /static/fonts/x.woff
+    # once the rules are served from /assets/
+    def rewrite(match):
+        quote, url = match.groups()
+        if re.match(r'^([a-z]+:|/|#)', url):
+            return match.group(0)
+        path = posixpath.normpath(
+            posixpath.join(posixpath.dirname(source), url))
+        return 'url(%s%s/%s%s)' % (quote, static_url, path, quote)
+    return CSS_URL.sub(rewrite, css)
+
+
+def bundle(static_folder, static_url, name, sources):
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            text = f.read()
+        if name.endswith('.css'):
+            text = absolute_urls(text, source, static_url)
+        # already minified files are kept as they are
+        if '.min.' in source:
+            parts.append(text.strip())
+        elif name.endswith('.css'):
+            parts.append(minify_css(text))
+        else:
+            parts.append(minify_js(text))
+    # a script missing its last semicolon must not run into the next one
+    separator = '\n' if name.endswith('.css') else ';\n'
+    return (separator.join(parts) + '\n').encode('utf-8')
+
+
+def write(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build(app):
+    # writes the bundles and the manifest, returns the manifest
+    dist = os.path.join(app.static_folder, DIST)
+    os.makedirs(dist, exist_ok=True)
+    manifest = {}
+    for name, sources in sorted(BUNDLES.items()):
+        data = bundle(app.static_folder, app.static_url_path, name, sources)
+        stem, ext = os.path.splitext(name)
+        hashed = '%s.%s%s' % (stem, hashlib.sha256(data).hexdigest()[:10], ext)
+        path = os.path.join(dist, hashed)
+        write(path, data)
+        write(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            write(path + '.br', brotli.compress(data, quality=11))
+        manifest[name] = hashed
+    write(os.path.join(dist, MANIFEST),
+          json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def load_manifest(app):
+    try:
+        with open(os.path.join(app.static_folder, DIST, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+#----------------------------------------------------------------------------#
+# Serving.
+#----------------------------------------------------------------------------#
+
+def asset_urls(name):
+    # the URLs to include for bundle `name`
+    hashed = current_app.extensions['assets'].get(name)
+    if hashed is not None:
+        return [url_for('assets.serve', filename=hashed)]
+    return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+
+@assets.route('/<filename>')
+def serve(filename):
+    path = os.path.join(current_app.static_folder, DIST, filename)
+    if not BUILT.match(filename) or not os.path.exists(path):
+        abort(404)
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if request.accept_encodings[name] and os.path.exists(path + suffix):
+            encoding, path = name, path + suffix
+            break
+    # the mimetype of the bundle, not of the .gz/.br file
+    response = send_file(path, mimetype='text/css' if filename.endswith('.css')
+                         else 'application/javascript', conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+
+@click.group('assets')
+def assets_command():
+    """Static asset bundles."""
+
+
+@assets_command.command('build')
+@with_appcontext
+def build_command():
+    """Bundle, minify, hash and precompress the stylesheets and scripts."""
+    manifest = build(current_app)
+    dist = os.path.join(current_app.static_folder, DIST)
+    for name, hashed in sorted(manifest.items()):
+        sizes = [os.path.getsize(os.path.join(dist, hashed + suffix))
+                 for suffix in ('', '.gz', '.br')
+                 if os.path.exists(os.path.join(dist, hashed + suffix))]
+        click.echo('%-10s %-28s %s bytes' % (
+            name, hashed, ' / '.join(str(size) for size in sizes)))
+    if brotli is None:
+        click.echo('Brotli is not installed, no .br variants', err=True)
+
+
+def init_app(app):
+    app.extensions['assets'] = load_manifest(app)
+    app.register_blueprint(assets)
+    app.cli.add_command(assets_command)
+    app.jinja_env.globals['asset_urls'] = asset_urls
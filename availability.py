@@ -0,0 +1,98 @@
+import datetime
+from bisect import bisect_left
+from sqlalchemy import and_, func, literal_column
+from sqlalchemy.dialects import postgresql
+from models import db, Show, SHOW_SLOT, live_shows
+
+#----------------------------------------------------------------------------#
+# Venue availability.
+#----------------------------------------------------------------------------#
+# A show holds its venue over [start_time, start_time + duration). Several
+# artists sharing a bill have shows in the same slot (same start time and
+# duration, see Show): that is one booking. Any other overlap at a venue is a
+# double booking, which scheduling.py refuses.
+#
+# On PostgreSQL the slots overlapping a window are found with tsrange && on
+# the GiST index ix_Show_venue_slot. Elsewhere, as a show lasts at most
+# MAX_DURATION, they are among the shows starting less than MAX_DURATION
+# before the window and before its end: a range scan of
+# ix_Show_venue_id_start_time. Either way the work follows the size of the
+# window, not the venue's history.
+
+DEFAULT_DURATION = 120  # minutes
+MAX_DURATION = datetime.timedelta(minutes=1440)  # ck_Show_duration
+# the longest window /venues/<id>/availability lists
+MAX_WINDOW = datetime.timedelta(days=366)
+# the times the arithmetic here stays within datetime's range for: looking
+# MAX_DURATION back from a show or a window, a show's end, a window's end
+EARLIEST = datetime.datetime.min + MAX_DURATION
+LATEST_SHOW = datetime.datetime.max - MAX_DURATION
+LATEST_WINDOW = datetime.datetime.max - MAX_WINDOW
+
+
+def near(start, end):
+    # criterion on Show: its slot overlaps [start, end) (on PostgreSQL), or
+    # it may (elsewhere, booked() keeps those it does)
+    if db.session.bind.dialect.name == 'postgresql':
+        slot = literal_column(SHOW_SLOT, type_=postgresql.TSRANGE)
+        return slot.op('&&')(func.tsrange(start, end))
+    return and_(Show.start_time > start - MAX_DURATION,
+                Show.start_time < end)
+
+
+def booked(venue_id, start, end):
+    # (start, end, [artist ids]) of the slots of the listed shows at the
+    # venue overlapping [start, end), by start time
+    rows = db.session.query(
+        Show.start_time, Show.duration, Show.artist_id
+    ).filter(
+        Show.venue_id == venue_id,
+        near(start, end),
+        live_shows()
+    ).order_by(Show.start_time, Show.duration, Show.artist_id)
+    slots = []
+    for start_time, duration, artist_id in rows:
+        end_time = start_time + datetime.timedelta(minutes=duration)
+        if end_time <= start:
+            continue
+        if slots and slots[-1][:2] == (start_time, end_time):
+            slots[-1][2].append(artist_id)
+        else:
+            slots.append((start_time, end_time, [artist_id]))
+    return slots
+
+
+def free(slots, start, end):
+    # the (start, end) gaps between booked `slots` within [start, end)
+    gaps = []
+    for slot_start, slot_end, _ in slots:
+        if slot_start > start:
+            gaps.append((start, min(slot_start, end)))
+        start = max(start, slot_end)
+    if start < end:
+        gaps.append((start, end))
+    return gaps
+
+
+def conflicts(venue_id, proposed):
+    """
+    Checks shows proposed at a venue, `proposed` being (start time, duration
+    in minutes) pairs. Returns {start time: [booked slots it overlaps]} for
+    those that would double-book it, from a single query over the span of
+    all of them.
+    """
+    if not proposed:
+        return {}
+    proposed = [(start_time, start_time + datetime.timedelta(minutes=duration))
+                for start_time, duration in proposed]
+    slots = booked(venue_id, min(s for s, _ in proposed),
+                   max(e for _, e in proposed))
+    starts = [slot[0] for slot in slots]
+    clashes = {}
+    for start_time, end_time in proposed:
+        # booked slots start at most MAX_DURATION before those they overlap
+        i = bisect_left(starts, start_time - MAX_DURATION)
+        for slot in slots[i:bisect_left(starts, end_time)]:
+            if slot[1] > start_time and slot[:2] != (start_time, end_time):
+                clashes.setdefault(start_time, []).append(slot)
+    return clashes
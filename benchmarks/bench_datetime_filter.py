@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of the `datetime` Jinja filter on pages/shows.html.
+
+Renders 10k show tiles twice: once the way the page used to be built
+(start_time stringified in the view, re-parsed by dateutil and formatted
+by babel.dates.format_datetime in the filter), and once with datetime
+objects going straight into the cached-pattern filter.
+
+    python -m benchmarks.bench_datetime_filter
+"""
+import datetime
+import os
+import time
+
+# pages/shows.html caches its tiles, every round would be a cache hit: the
+# app reads FRAGMENT_CACHE_URL from the environment when config is imported
+os.environ['FRAGMENT_CACHE_URL'] = ''
+
+import babel.dates  # noqa: E402
+import dateutil.parser  # noqa: E402
+from flask import render_template  # noqa: E402
+
+from app import create_app, format_datetime  # noqa: E402
+
+app = create_app()
+
+TILES = 10000
+ROUNDS = 3
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def make_shows(stringify):
+    start = datetime.datetime(2020, 1, 1, 20, 0)
+    shows = []
+    for i in range(TILES):
+        start_time = start + datetime.timedelta(hours=7 * i)
+        shows.append({
+            "venue_id": i % 50,
+            "venue_name": "Venue %d" % (i % 50),
+            "artist_id": i % 200,
+            "artist_name": "Artist %d" % (i % 200),
+            "artist_image_link": "https://example.com/%d.jpg" % (i % 200),
+            "start_time": start_time.strftime("%Y/%m/%d, %H:%M:%S")
+            if stringify else start_time
+        })
+    return shows
+
+
+def render(shows):
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        html = render_template('pages/shows.html', shows=shows, next_url=None)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, html
+
+
+def main():
+    with app.test_request_context('/shows'):
+        app.jinja_env.filters['datetime'] = legacy_format_datetime
+        legacy, legacy_html = render(make_shows(stringify=True))
+        app.jinja_env.filters['datetime'] = format_datetime
+        cached, cached_html = render(make_shows(stringify=False))
+
+    assert legacy_html == cached_html, 'filters disagree'
+    print('%d tiles, best of %d' % (TILES, ROUNDS))
+    print('  stringify + parse + format: %8.1f ms' % (legacy * 1000))
+    print('  datetime + cached pattern:  %8.1f ms' % (cached * 1000))
+    print('  speedup: %.1fx' % (legacy / cached))
+
+
+if __name__ == '__main__':
+    main()
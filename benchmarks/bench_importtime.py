@@ -0,0 +1,90 @@
+"""
+Import time of the app module, from `python -X importtime`.
+
+Imports `app` in fresh interpreters and reports the median cumulative
+time of the module and of its heaviest imports. Run it on a checkout
+before and after a change, with --out and --compare:
+
+    python -m benchmarks.bench_importtime --out after.json \
+        --compare benchmarks/importtime_baseline.json
+
+importtime_baseline.json holds the numbers from before the imports of
+app.py were made lazy (Flask-Moment, alembic, babel and dateutil at import
+time), taken the same way.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# import time:   self [us] | cumulative | imported package
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def import_once(module):
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        check=True)
+    # cumulative ms of every package, the first import of it wins
+    cumulative = {}
+    for line in process.stderr.decode('utf-8').splitlines():
+        match = LINE.match(line)
+        if match:
+            cumulative.setdefault(match.group(4), int(match.group(2)) / 1000)
+    return cumulative
+
+
+def measure(module, runs):
+    samples = [import_once(module) for _ in range(runs)]
+    names = set.intersection(*(set(sample) for sample in samples))
+    return {name: statistics.median(sample[name] for sample in samples)
+            for name in names}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--out', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results to compare against')
+    args = parser.parse_args()
+
+    results = measure(args.module, args.runs)
+    before = {}
+    if args.compare:
+        with open(args.compare) as f:
+            before = json.load(f)['cumulative_ms']
+
+    print('%-40s %12s %12s' % ('module', 'ms', 'before ms'))
+    heaviest = sorted(results, key=results.get, reverse=True)[:args.top]
+    for name in heaviest:
+        print('%-40s %12.1f %12s' % (
+            name, results[name],
+            '%.1f' % before[name] if name in before else '-'))
+    gone = sorted((name for name in before if name not in results),
+                  key=before.get, reverse=True)[:args.top]
+    for name in gone:
+        print('%-40s %12s %12.1f' % (name, 'not imported', before[name]))
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({
+                'module': args.module,
+                'python': sys.version.split()[0],
+                'runs': args.runs,
+                # the packages that take a millisecond or more
+                'cumulative_ms': {name: round(ms, 1)
+                                  for name, ms in sorted(results.items())
+                                  if ms >= 1},
+            }, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
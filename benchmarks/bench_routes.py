@@ -0,0 +1,414 @@
+"""
+Route benchmark suite.
+
+Seeds the benchmark database with benchmarks/datagen.py, then drives every
+route of the app through the Flask test client and reports, per route:
+
+  - latency percentiles (p50/p95/p99) over --iterations requests
+  - SQL statements per request (from the Server-Timing header, see
+    instrumentation.py)
+  - peak memory allocated while serving one request (tracemalloc, measured
+    in a separate pass so it doesn't skew the timings)
+
+The results are written as JSON, and two result files can be compared:
+
+    python -m benchmarks.bench_routes --shows 100000 --out before.json
+    ... change something ...
+    python -m benchmarks.bench_routes --shows 100000 --out after.json
+    python -m benchmarks.bench_routes --compare before.json after.json
+
+--shows takes a number or one of 1k, 10k, 100k, 1M. Use --no-seed to run
+against the data of a previous run. BENCH_DATABASE_URL picks the database
+(a SQLite file by default), it is dropped and recreated when seeding.
+"""
+import argparse
+import datetime
+import json
+import platform
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+import sqlalchemy
+
+from benchmarks import datagen
+from models import db, Artist, Venue, Show
+import counters
+
+SERVER_TIMING = re.compile(r'desc="(\d+) queries"')
+# the admin routes of the API (bulk deletes, export) need a token, see api.py
+ADMIN_API_TOKEN = 'bench'
+HEADERS = {'Authorization': 'Bearer ' + ADMIN_API_TOKEN}
+
+
+#----------------------------------------------------------------------------#
+# Routes.
+#----------------------------------------------------------------------------#
+# One entry per endpoint: (endpoint, method, request builder). The builder
+# gets the run context and the iteration number and returns the url and the
+# form data (or a JSON body, as a string). Write routes work on rows of their own (see add_victims) or on
+# ids out of the way of the read routes, so every run does the same work.
+
+def artist_form(i):
+    return {
+        'name': 'Bench Artist %d' % i,
+        'city': 'City 0001',
+        'state': 'CA',
+        'phone': '555-555-5555',
+        'genres': ['Jazz', 'Soul'],
+        'image_link': 'https://example.com/image.jpg',
+        'facebook_link': 'https://facebook.com/bench',
+        'website': 'https://example.com',
+        'seeking_description': '',
+    }
+
+
+def venue_form(i):
+    form = artist_form(i)
+    form['name'] = 'Bench Venue %d' % i
+    form['address'] = '%d Bench St' % i
+    return form
+
+
+def get(url):
+    return lambda ctx, i: (url, None)
+
+
+ROUTES = [
+    ('main.index', 'GET', get('/')),
+    ('main.venues', 'GET', get('/venues')),
+    ('main.search_venues', 'POST',
+     lambda ctx, i: ('/venues/search', {'search_term': 'hall'})),
+    ('main.show_venue', 'GET',
+     lambda ctx, i: ('/venues/%d' % ctx.venue_id(), None)),
+    ('main.venue_availability', 'GET', lambda ctx, i: (
+        '/venues/%d/availability?start_time=%s' % (
+            ctx.venue_id(), ctx.future.isoformat()), None)),
+    ('main.create_venue_form', 'GET', get('/venues/create')),
+    ('main.create_venue_submission', 'POST',
+     lambda ctx, i: ('/venues/create', venue_form(i))),
+    ('main.delete_venue', 'DELETE',
+     lambda ctx, i: ('/venues/%d/delete' % ctx.victims['venues'].pop(), None)),
+    ('main.artists', 'GET', get('/artists')),
+    ('main.search_artists', 'POST',
+     lambda ctx, i: ('/artists/search', {'search_term': 'blue'})),
+    ('main.show_artist', 'GET',
+     lambda ctx, i: ('/artists/%d' % ctx.artist_id(), None)),
+    ('main.browse_genre', 'GET',
+     lambda ctx, i: ('/genres/%s/%s' % (ctx.rng.choice(datagen.GENRES),
+                                        ctx.rng.choice(['artists', 'venues'])),
+                     None)),
+    ('main.edit_artist', 'GET',
+     lambda ctx, i: ('/artists/%d/edit' % ctx.artist_id(), None)),
+    ('main.edit_artist_submission', 'POST',
+     lambda ctx, i: ('/artists/%d/edit' % ctx.victims['edit_artist'],
+                     artist_form(i))),
+    ('main.delete_artist', 'DELETE',
+     lambda ctx, i: ('/artists/%d/delete' % ctx.victims['artists'].pop(),
+                     None)),
+    ('main.edit_venue', 'GET',
+     lambda ctx, i: ('/venues/%d/edit' % ctx.venue_id(), None)),
+    ('main.edit_venue_submission', 'POST',
+     lambda ctx, i: ('/venues/%d/edit' % ctx.victims['edit_venue'],
+                     venue_form(i))),
+    ('main.create_artist_form', 'GET', get('/artists/create')),
+    ('main.create_artist_submission', 'POST',
+     lambda ctx, i: ('/artists/create', artist_form(i))),
+    ('main.shows', 'GET', get('/shows')),
+    ('main.shows_calendar', 'GET', get('/shows/calendar')),
+    ('main.create_shows', 'GET', get('/shows/create')),
+    ('main.create_show_submission', 'POST', lambda ctx, i: ('/shows/create', {
+        'artist_id': ctx.artist_id(),
+        'venue_id': ctx.venue_id(),
+        # past the seeded range, a show length apart: never a duplicate key
+        # or a double booking
+        'start_time': (ctx.future + datetime.timedelta(hours=2 * ctx.tick()))
+        .strftime('%Y-%m-%d %H:%M:%S'),
+    })),
+    ('api.list_artists', 'GET', get('/api/v1/artists')),
+    ('api.get_artist', 'GET',
+     lambda ctx, i: ('/api/v1/artists/%d' % ctx.artist_id(), None)),
+    ('api.list_venues', 'GET', get('/api/v1/venues')),
+    ('api.get_venue', 'GET',
+     lambda ctx, i: ('/api/v1/venues/%d' % ctx.venue_id(), None)),
+    ('api.list_shows', 'GET', get('/api/v1/shows')),
+    ('api.get_show', 'GET', lambda ctx, i: (
+        '/api/v1/shows/%d/%s' % ctx.rng.choice(ctx.shows), None)),
+    ('api.shows_calendar', 'GET', get('/api/v1/shows/calendar')),
+    ('api.export_shows', 'GET', get('/api/v1/export/shows.ndjson')),
+    ('api.delete_artists', 'POST', lambda ctx, i: (
+        '/api/v1/artists/delete',
+        json.dumps({'ids': [ctx.victims['artists'].pop()]}))),
+    ('api.delete_venues', 'POST', lambda ctx, i: (
+        '/api/v1/venues/delete',
+        json.dumps({'ids': [ctx.victims['venues'].pop()]}))),
+    ('health.healthz', 'GET', get('/healthz')),
+    ('health.readyz', 'GET', get('/readyz')),
+    ('metrics', 'GET', get('/metrics')),
+]
+
+# routes whose work grows with the whole table get fewer iterations
+# (the export streams its rows after the response headers, so its queries
+# are not in Server-Timing)
+HEAVY = {'api.export_shows': 5}
+
+
+class Context(object):
+
+    def __init__(self, summary, seed):
+        self.rng = random.Random(seed)
+        self.artists = summary['artists']
+        self.venues = summary['venues']
+        self.future = datetime.datetime.fromisoformat(summary['anchor']) + \
+            datetime.timedelta(days=datagen.SPAN_DAYS)
+        self.ticks = 0
+        self.victims = {}
+        self.shows = [
+            (artist_id, start_time.isoformat()) for artist_id, start_time in
+            db.session.query(Show.artist_id, Show.start_time).
+            order_by(Show.artist_id, Show.start_time).limit(1000)
+        ]
+
+    def artist_id(self):
+        return self.rng.randint(1, self.artists)
+
+    def venue_id(self):
+        return self.rng.randint(1, self.venues)
+
+    def tick(self):
+        self.ticks += 1
+        return self.ticks
+
+
+def add_victims(ctx, count):
+    # rows for the write routes, each with a few shows to delete with it
+    rows = {}
+    for kind, model, form in (('artists', Artist, artist_form),
+                              ('venues', Venue, venue_form)):
+        objects = []
+        for i in range(count):
+            data = form(i)
+            data.pop('seeking_description')
+            data['name'] = 'Victim ' + data['name']
+            objects.append(model(**data))
+        db.session.add_all(objects)
+        db.session.flush()
+        rows[kind] = [o.id for o in objects]
+    for artist_id, venue_id in zip(rows['artists'], rows['venues']):
+        for k in range(3):
+            db.session.add(Show(
+                artist_id=artist_id, venue_id=venue_id,
+                start_time=ctx.future + datetime.timedelta(days=k)))
+    db.session.commit()
+    counters.rebuild()
+    # the deletes pop from the end, the edits update the first victims
+    # (there is one more victim than deletes)
+    ctx.victims = {
+        'artists': rows['artists'],
+        'venues': rows['venues'],
+        'edit_artist': rows['artists'][0],
+        'edit_venue': rows['venues'][0],
+    }
+
+
+#----------------------------------------------------------------------------#
+# Measurements.
+#----------------------------------------------------------------------------#
+
+def percentile(values, pct):
+    # nearest rank
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def call(client, method, url, data):
+    content_type = 'application/json' if isinstance(data, str) else None
+    response = client.open(url, method=method, data=data,
+                           content_type=content_type, headers=HEADERS)
+    response.get_data()  # drains streamed responses
+    match = SERVER_TIMING.search(response.headers.get('Server-Timing', ''))
+    return response.status_code, int(match.group(1)) if match else None
+
+
+def run_route(client, ctx, endpoint, method, build, iterations, warmup):
+    for i in range(warmup):
+        url, data = build(ctx, i)
+        call(client, method, url, data)
+
+    timings, queries, statuses = [], [], {}
+    for i in range(iterations):
+        url, data = build(ctx, i)
+        start = time.perf_counter()
+        status, count = call(client, method, url, data)
+        timings.append(time.perf_counter() - start)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if count is not None:
+            queries.append(count)
+
+    url, data = build(ctx, iterations)
+    tracemalloc.start()
+    call(client, method, url, data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'method': method,
+        'iterations': iterations,
+        'status': statuses,
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+        'queries': max(queries) if queries else None,
+        'peak_kb': round(peak / 1024.0, 1),
+    }
+
+
+def uncovered_endpoints():
+    covered = set(endpoint for endpoint, _, _ in ROUTES)
+    return sorted(set(rule.endpoint
+                      for rule in datagen.setup().url_map.iter_rules()
+                      if rule.endpoint != 'static') - covered)
+
+
+def run(shows, iterations, warmup, seed, do_seed, only):
+    app = datagen.prepare_app()
+    app.config['ADMIN_API_TOKEN'] = ADMIN_API_TOKEN
+    results = {}
+    with app.app_context():
+        if do_seed:
+            start = time.perf_counter()
+            summary = datagen.seed(shows, seed=seed)
+            summary['seed_seconds'] = round(time.perf_counter() - start, 2)
+        else:
+            summary = {
+                'shows': Show.query.count(),
+                'artists': db.session.query(db.func.max(Artist.id)).scalar(),
+                'venues': db.session.query(db.func.max(Venue.id)).scalar(),
+                'anchor': datagen.default_anchor().isoformat(),
+                'seed': seed,
+            }
+        ctx = Context(summary, seed)
+        # one victim per request that deletes one (two routes per kind),
+        # warm-up and the tracemalloc pass included
+        add_victims(ctx, 2 * (warmup + iterations + 1) + 1)
+        db.session.remove()
+
+        missing = uncovered_endpoints()
+        if missing:
+            print('not benchmarked: ' + ', '.join(missing), file=sys.stderr)
+
+        client = app.test_client()
+        for endpoint, method, build in ROUTES:
+            if only and not any(re.search(p, endpoint) for p in only):
+                continue
+            n = min(iterations, HEAVY.get(endpoint, iterations))
+            results[endpoint] = run_route(
+                client, ctx, endpoint, method, build, n, min(warmup, n))
+            print_row(endpoint, results[endpoint])
+            db.session.remove()
+
+    return {
+        'meta': {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'database': db.get_engine(app).url.get_backend_name(),
+            'iterations': iterations,
+            'warmup': warmup,
+            'data': summary,
+        },
+        'routes': results,
+    }
+
+
+#----------------------------------------------------------------------------#
+# Reports.
+#----------------------------------------------------------------------------#
+
+HEADER = '%-26s %-6s %9s %9s %9s %8s %10s' % (
+    'endpoint', 'method', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'peak KiB')
+
+
+def print_row(endpoint, r):
+    if print_row.first:
+        print(HEADER)
+        print_row.first = False
+    print('%-26s %-6s %9.2f %9.2f %9.2f %8s %10.1f' % (
+        endpoint, r['method'], r['p50_ms'], r['p95_ms'], r['p99_ms'],
+        '-' if r['queries'] is None else r['queries'], r['peak_kb']))
+    sys.stdout.flush()
+
+
+print_row.first = True
+
+
+def ratio(new, old):
+    if not old:
+        return '      -'
+    return '%+6.0f%%' % ((new - old) * 100.0 / old)
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    for label, run_ in (('before', before), ('after', after)):
+        print('%-7s %s shows on %s, %s' % (
+            label, run_['meta']['data']['shows'], run_['meta']['database'],
+            run_['meta']['created']))
+    print('%-26s %9s %8s %9s %8s %13s %14s' % (
+        'endpoint', 'p50 ms', '', 'p95 ms', '', 'queries', 'peak KiB'))
+    for endpoint in sorted(set(before['routes']) | set(after['routes'])):
+        old = before['routes'].get(endpoint)
+        new = after['routes'].get(endpoint)
+        if old is None or new is None:
+            print('%-26s %s' % (endpoint, 'only ' + ('after' if old is None
+                                                     else 'before')))
+            continue
+        print('%-26s %9.2f %8s %9.2f %8s %6s -> %-4s %6.0f -> %-6.0f' % (
+            endpoint,
+            new['p50_ms'], ratio(new['p50_ms'], old['p50_ms']),
+            new['p95_ms'], ratio(new['p95_ms'], old['p95_ms']),
+            old['queries'], new['queries'], old['peak_kb'], new['peak_kb']))
+
+
+def parse_shows(value):
+    return datagen.SCALES.get(value) or int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark every route of the app.')
+    parser.add_argument('--shows', type=parse_shows, default='1k',
+                        help='number of shows to seed (or 1k, 10k, 100k, 1M)')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-seed', dest='do_seed', action='store_false',
+                        help='reuse the data already in the database')
+    parser.add_argument('--only', action='append', metavar='REGEX',
+                        help='benchmark matching endpoints only')
+    parser.add_argument('--out', help='write the results to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two result files and exit')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = run(args.shows, args.iterations, args.warmup, args.seed,
+                  args.do_seed, args.only)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Startup benchmark: how long a fresh process takes to serve.
+
+Every run starts a new interpreter (as a worker or a deploy would) and times
+importing the app module, create_app(), then the first and the second
+request of a few pages through the test client. The first request pays for
+what is done lazily (template compilation, the first database connection);
+the second is the steady state. Reports the median of the runs.
+
+With gunicorn's preload_app the import and create_app() are paid once, in
+the master, and only the first request is paid again by every worker.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --no-seed
+
+The pages read the benchmark database (see datagen.py), seeded with 1k
+shows unless --no-seed is given.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ['/', '/venues', '/artists', '/shows']
+
+# run in the child process, prints its timings (ms) as JSON
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+timings = {'import': imported - start, 'create_app': created - imported}
+client = application.test_client()
+for url in %r:
+    for run in ('first', 'second'):
+        before = time.perf_counter()
+        status = client.get(url).status_code
+        timings['%%s %%s' %% (run, url)] = time.perf_counter() - before
+        if status != 200:
+            sys.exit('%%s answered %%d' %% (url, status))
+timings['total'] = time.perf_counter() - start
+print(json.dumps({k: v * 1000 for k, v in timings.items()}))
+''' % (PAGES,)
+
+
+def run_once():
+    # as it runs in production, see wsgi.py
+    env = dict(os.environ, FYYUR_ENV='production',
+               SECRET_KEY=os.environ.get('SECRET_KEY', 'bench'))
+    output = subprocess.check_output(
+        [sys.executable, '-c', CHILD], cwd=ROOT, env=env)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--no-seed', action='store_true',
+                        help='reuse the data already in the database')
+    args = parser.parse_args()
+
+    # points DATABASE_URL at the benchmark database, for the children too
+    from benchmarks import datagen
+    app = datagen.setup()
+    if not args.no_seed:
+        with app.app_context():
+            datagen.seed(1000)
+
+    runs = [run_once() for _ in range(args.runs)]
+    print('%-20s %10s %10s %10s' % ('step', 'median ms', 'min ms', 'max ms'))
+    for step in runs[0]:
+        values = [run[step] for run in runs]
+        print('%-20s %10.1f %10.1f %10.1f' % (
+            step, statistics.median(values), min(values), max(values)))
+
+
+if __name__ == '__main__':
+    main()
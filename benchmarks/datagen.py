@@ -0,0 +1,169 @@
+"""
+Deterministic data generator for the benchmarks.
+
+setup() points the app at the benchmark database (BENCH_DATABASE_URL, a
+SQLite file in the temp directory by default) and creates it; call it
+before anything imports the app, which reads DATABASE_URL from the
+environment when config is imported. The database is dropped and
+recreated by seed(), never point it at real data.
+
+The same (shows, seed, anchor) always produce the same rows. Start times
+are spread evenly around the anchor (today at midnight by default), so
+half of the shows are past and half upcoming whenever the data is made.
+"""
+import datetime
+import logging
+import os
+import random
+import tempfile
+
+from forms import genres_choices, state_choices
+from models import db, Artist, Venue, Show
+import counters
+
+DEFAULT_URL = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'fyyur_bench.db')
+
+app = None  # see setup()
+
+BATCH = 5000
+SPAN_DAYS = 730  # shows cover one year either side of the anchor
+
+SCALES = {
+    '1k': 1000,
+    '10k': 10000,
+    '100k': 100000,
+    '1M': 1000000,
+}
+
+GENRES = [genre for genre, _ in genres_choices]
+STATES = [state for state, _ in state_choices]
+WORDS = ['Blue', 'Red', 'Electric', 'Velvet', 'Midnight', 'Golden', 'Silver',
+         'Wild', 'Lazy', 'Neon', 'Crystal', 'Iron', 'Paper', 'Brass', 'Royal']
+NOUNS = ['Hop', 'Lounge', 'Hall', 'Garden', 'Room', 'Club', 'Stage', 'Den',
+         'Band', 'Trio', 'Collective', 'Orchestra', 'Project', 'Sound']
+
+
+def default_anchor():
+    return datetime.datetime.combine(datetime.date.today(), datetime.time())
+
+
+def sizes(shows):
+    # artists and venues grow with the number of shows
+    return max(10, shows // 20), max(5, shows // 50), max(5, shows // 500)
+
+
+def setup(flask_app=None):
+    """
+    The app the benchmarks run, created on the first call on the benchmark
+    database, unless `flask_app` (e.g. the tests' one) is given.
+    """
+    global app
+    if flask_app is not None:
+        app = flask_app
+    elif app is None:
+        os.environ['DATABASE_URL'] = os.environ.get(
+            'BENCH_DATABASE_URL', DEFAULT_URL)
+        from app import create_app
+        app = create_app()
+    return app
+
+
+def prepare_app():
+    # benchmark the app as it runs in production: no template stat calls,
+    # no per-request log lines
+    app = setup()
+    app.jinja_env.auto_reload = False
+    app.logger.setLevel(logging.WARNING)
+    return app
+
+
+def insert(table, rows):
+    for i in range(0, len(rows), BATCH):
+        db.session.execute(table.insert(), rows[i:i + BATCH])
+
+
+def seed(shows, seed=0, anchor=None):
+    """Recreates the schema and fills it, returns a summary dict."""
+    anchor = anchor or default_anchor()
+    rng = random.Random(seed)
+    n_artists, n_venues, n_cities = sizes(shows)
+    cities = [('City %04d' % i, STATES[i % len(STATES)]) for i in range(n_cities)]
+
+    def name(i, kind):
+        return '%s %s %s %d' % (rng.choice(WORDS), rng.choice(WORDS),
+                                kind if kind else rng.choice(NOUNS), i)
+
+    def url(kind, i):
+        return 'https://example.com/%s/%d' % (kind, i)
+
+    db.drop_all()
+    db.create_all()
+
+    artists = []
+    for i in range(1, n_artists + 1):
+        city, state = rng.choice(cities)
+        artists.append({
+            'id': i,
+            'name': name(i, None),
+            'city': city,
+            'state': state,
+            'phone': '555-%03d-%04d' % (i % 1000, i % 10000),
+            'genres': rng.sample(GENRES, rng.randint(1, 3)),
+            'image_link': url('artist-image', i),
+            'facebook_link': url('artist-facebook', i),
+            'website': url('artist', i),
+            'seeking_venue': rng.random() < 0.3,
+            'seeking_description': None,
+        })
+    insert(Artist.__table__, artists)
+
+    venues = []
+    for i in range(1, n_venues + 1):
+        city, state = rng.choice(cities)
+        venues.append({
+            'id': i,
+            'name': name(i, rng.choice(['Hall', 'Lounge', 'Club', 'Music'])),
+            'city': city,
+            'state': state,
+            'address': '%d Main St' % i,
+            'phone': '555-%03d-%04d' % (i % 1000, i % 10000),
+            'genres': rng.sample(GENRES, rng.randint(1, 4)),
+            'image_link': url('venue-image', i),
+            'facebook_link': url('venue-facebook', i),
+            'website': url('venue', i),
+            'seeking_talent': rng.random() < 0.3,
+            'seeking_description': None,
+        })
+    insert(Venue.__table__, venues)
+
+    # the k-th show of an artist is k slots after the artist's first slot,
+    # which keeps (artist_id, start_time) unique
+    per_artist = -(-shows // n_artists)
+    slot = datetime.timedelta(days=SPAN_DAYS) / per_artist
+    first = anchor - datetime.timedelta(days=SPAN_DAYS / 2)
+    rows = []
+    for i in range(shows):
+        artist_id = i % n_artists + 1
+        k = i // n_artists
+        start_time = first + slot * k + datetime.timedelta(
+            minutes=rng.randrange(int(slot.total_seconds() // 60) or 1))
+        rows.append({
+            'artist_id': artist_id,
+            'venue_id': rng.randint(1, n_venues),
+            'start_time': start_time.replace(second=0, microsecond=0),
+        })
+        if len(rows) == BATCH:
+            insert(Show.__table__, rows)
+            rows = []
+    insert(Show.__table__, rows)
+    db.session.commit()
+    counters.rebuild()
+
+    return {
+        'shows': shows,
+        'artists': n_artists,
+        'venues': n_venues,
+        'cities': n_cities,
+        'seed': seed,
+        'anchor': anchor.isoformat(),
+    }
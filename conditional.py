@@ -0,0 +1,106 @@
+import datetime
+import hashlib
+import os
+from flask import current_app, g, request, session
+from sqlalchemy import Integer, case, func
+from models import db, Show
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#----------------------------------------------------------------------------#
+# Views call not_modified() with a few values that change whenever the page
+# would (e.g. updated_at columns and counts from one aggregate query), before
+# loading anything else. When the client (or the CDN) already holds that
+# version of the page it gets a 304 at once; otherwise the view renders the
+# page as usual and the response carries the ETag built from the same
+# values, with Cache-Control: no-cache so that it is revalidated on every
+# use. There is no Last-Modified: rows leaving a page (deleted, or moved
+# elsewhere by the importer) change its ETag but make it older, not newer.
+#
+# The ETag also covers the templates, the asset bundles and RELEASE (see
+# config.py), so a deploy changing the markup invalidates every cached page. Pages with
+# pending flash messages are never answered with a 304.
+
+
+def template_digest(app):
+    # changes with the templates and with the asset bundles they include
+    digest = hashlib.md5(repr(
+        sorted(app.extensions.get('assets', {}).items())).encode('utf-8'))
+    for root, dirs, files in sorted(os.walk(os.path.join(
+            app.root_path, app.template_folder))):
+        for name in sorted(files):
+            with open(os.path.join(root, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def not_modified(parts):
+    """
+    Returns an empty 304 response if the client's copy of the page built
+    from `parts` is current, None otherwise.
+    """
+    if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+        return None
+    digest = hashlib.md5(repr(
+        (current_app.config['ETAG_SALT'], request.full_path, parts)
+    ).encode('utf-8')).hexdigest()
+    g.etag = digest
+    if not request.if_none_match.contains_weak(digest):
+        return None
+    return current_app.response_class(status=304)
+
+
+def detail_validators(model, id, show_fk, related, related_fk):
+    """
+    The parts of the page of one artist or venue (`model`) listing its
+    shows with their `related` venue or artist, from a single aggregate
+    statement, or None if there is no such row (or it is soft-deleted).
+    """
+    now = datetime.datetime.now()
+    row = db.session.query(
+        model.updated_at,
+        func.max(Show.updated_at),
+        func.max(related.updated_at),
+        func.count(Show.start_time),
+        # the past / upcoming split moves with time
+        func.max(case([(Show.start_time <= now, Show.start_time)]))
+    ).outerjoin(Show, show_fk == model.id).\
+        outerjoin(related, related_fk == related.id).\
+        filter(model.id == id, model.deleted_at.is_(None)).\
+        group_by(model.id, model.updated_at).first()
+    return tuple(row) if row is not None else None
+
+
+def page_validators(query, ids, stamps):
+    """
+    The parts of a page listing the rows of `query` (filtered, ordered and
+    limited), from a single aggregate statement over them: the count and
+    the first, last and (integers) sum of each of the `ids` columns change
+    with the rows listed, the latest of the `stamps` (updated_at columns)
+    with their content.
+    """
+    page = query.with_entities(*[
+        column.label('c%d' % i) for i, column in enumerate(ids + stamps)
+    ]).subquery()
+    columns = list(page.c)
+    aggregates = [func.count()]
+    for column in columns[:len(ids)]:
+        aggregates += [func.min(column), func.max(column)]
+        if isinstance(column.type, Integer):
+            aggregates.append(func.sum(column))
+    aggregates += [func.max(column) for column in columns[len(ids):]]
+    return tuple(db.session.query(*aggregates).one())
+
+
+def init_app(app):
+    app.config.setdefault('RELEASE', '')
+    app.config['ETAG_SALT'] = app.config['RELEASE'] + template_digest(app)
+
+    @app.after_request
+    def add_validators(response):
+        etag = g.pop('etag', None)
+        if etag is None or response.status_code not in (200, 304):
+            return response
+        response.set_etag(etag, weak=True)
+        response.cache_control.no_cache = True
+        return response
@@ -0,0 +1,201 @@
+import datetime
+from collections import defaultdict
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, bindparam, case, func, or_, select
+from models import db, Artist, Venue, Show, CounterSweep, live_shows
+
+#----------------------------------------------------------------------------#
+# Upcoming / past show counters.
+#----------------------------------------------------------------------------#
+# Artist and Venue carry upcoming_shows_count and past_shows_count, so pages
+# listing many of them don't count their shows on every request. Only the
+# shows the site lists are counted: not those of soft-deleted artists and
+# venues (see deletion.py).
+#
+# The counters are as of CounterSweep.swept_at: a show starting after it is
+# upcoming, any other show is past. They are updated in the transaction that
+# adds, deletes, hides or restores shows (add_shows, remove_shows,
+# add_shows_where, remove_shows_where), and `flask counters sweep`, run every
+# few minutes from cron, moves the shows that started since the last sweep
+# from upcoming to past and advances swept_at. `flask counters check`
+# recounts everything from the Show table and reports (or with --rebuild,
+# fixes) any difference.
+#
+# Writers hold a shared lock on the CounterSweep row and the sweeper an
+# exclusive one, so a show is never classified against a swept_at that a
+# concurrent sweep is moving past it.
+
+# the counted models, and the Show column that references them
+TARGETS = ((Artist, Show.artist_id), (Venue, Show.venue_id))
+
+
+def watermark(lock=None):
+    # the CounterSweep row, lock is None, 'share' or 'update'
+    query = db.session.query(CounterSweep)
+    if lock:
+        query = query.with_for_update(read=lock == 'share')
+    mark = query.order_by(CounterSweep.id).first()
+    if mark is None:
+        # counters start from an empty Show table
+        mark = CounterSweep(swept_at=datetime.datetime.now())
+        db.session.add(mark)
+        db.session.flush()
+    return mark
+
+
+def apply(model, deltas):
+    # adds {id: (upcoming, past)} to the counters, in id order so concurrent
+    # writers lock rows in the same order
+    table = model.__table__
+    params = [
+        {'_id': id, '_upcoming': upcoming, '_past': past}
+        for id, (upcoming, past) in sorted(deltas.items())
+        if upcoming or past
+    ]
+    if not params:
+        return
+    db.session.execute(
+        table.update().where(table.c.id == bindparam('_id')).values(
+            upcoming_shows_count=table.c.upcoming_shows_count +
+            bindparam('_upcoming'),
+            past_shows_count=table.c.past_shows_count + bindparam('_past')),
+        params)
+
+
+def count_shows(rows, sign):
+    swept_at = watermark(lock='share').swept_at
+    for model, fk in TARGETS:
+        deltas = defaultdict(lambda: [0, 0])
+        for row in rows:
+            deltas[row[fk.key]][0 if row['start_time'] > swept_at else 1] += sign
+        apply(model, deltas)
+
+
+def add_shows(rows):
+    # rows: mappings with artist_id, venue_id and start_time (a datetime)
+    count_shows(rows, 1)
+
+
+def remove_shows(rows):
+    count_shows(rows, -1)
+
+
+def count_shows_where(sign, criterion):
+    # the listed shows matching `criterion`, returns how many there are
+    swept_at = watermark(lock='share').swept_at
+    upcoming = func.sum(case([(Show.start_time > swept_at, 1)], else_=0))
+    totals = {}
+    for model, fk in TARGETS:
+        rows = db.session.query(fk, upcoming, func.count()).\
+            filter(live_shows(), *criterion).group_by(fk).all()
+        apply(model, {id: (sign * up, sign * (count - up))
+                      for id, up, count in rows})
+        totals[model] = sum(count for _, _, count in rows)
+    # every show has one artist and one venue: both sides count the same
+    # shows, the artists' total is returned
+    return totals[Artist]
+
+
+def add_shows_where(*criterion):
+    # to call once the shows matching `criterion` are listed again
+    return count_shows_where(1, criterion)
+
+
+def remove_shows_where(*criterion):
+    # to call before deleting or hiding the shows matching `criterion` in
+    # bulk
+    return count_shows_where(-1, criterion)
+
+
+def sweep(now=None):
+    # moves the shows that started since the last sweep to past, returns
+    # how many were moved
+    now = now or datetime.datetime.now()
+    mark = watermark(lock='update')
+    moved = {}
+    if now > mark.swept_at:
+        for model, fk in TARGETS:
+            rows = db.session.query(fk, func.count()).filter(
+                Show.start_time > mark.swept_at,
+                Show.start_time <= now,
+                live_shows()
+            ).group_by(fk).all()
+            apply(model, {id: (-n, n) for id, n in rows})
+            moved[model] = sum(n for _, n in rows)
+        mark.swept_at = now
+    db.session.commit()
+    # the same shows on both sides, see count_shows_where()
+    return moved.get(Artist, 0)
+
+
+def recount(model, fk, swept_at):
+    # (upcoming, past) correlated counts for each row of `model`
+    def count(condition):
+        return select([func.count()]).\
+            where(and_(fk == model.id, condition, live_shows())).as_scalar()
+    return count(Show.start_time > swept_at), count(Show.start_time <= swept_at)
+
+
+def check():
+    # (model, id, stored (upcoming, past), actual (upcoming, past)) for every
+    # artist and venue whose counters are off
+    swept_at = watermark().swept_at
+    for model, fk in TARGETS:
+        upcoming, past = recount(model, fk, swept_at)
+        rows = db.session.query(
+            model.id, model.upcoming_shows_count, model.past_shows_count,
+            upcoming, past
+        ).filter(or_(
+            model.upcoming_shows_count != upcoming,
+            model.past_shows_count != past
+        )).order_by(model.id)
+        for id, stored_upcoming, stored_past, actual_upcoming, actual_past in rows:
+            yield (model.__name__, id, (stored_upcoming, stored_past),
+                   (actual_upcoming, actual_past))
+
+
+def rebuild(now=None):
+    # recounts every artist and venue as of now
+    now = now or datetime.datetime.now()
+    watermark(lock='update').swept_at = now
+    for model, fk in TARGETS:
+        upcoming, past = recount(model, fk, now)
+        db.session.query(model).update({
+            model.upcoming_shows_count: upcoming,
+            model.past_shows_count: past,
+        }, synchronize_session=False)
+    db.session.commit()
+
+
+@click.group('counters')
+def counters_command():
+    """Upcoming/past show counters of artists and venues."""
+
+
+@counters_command.command('sweep')
+@with_appcontext
+def sweep_command():
+    """Move the shows that have started to the past counters."""
+    click.echo('%d shows moved to past' % sweep())
+
+
+@counters_command.command('check')
+@click.option('--rebuild', 'fix', is_flag=True,
+              help='Recount every artist and venue from the Show table.')
+@with_appcontext
+def check_command(fix):
+    """Compare the counters with the Show table."""
+    if fix:
+        rebuild()
+        click.echo('counters rebuilt')
+        return
+    wrong = 0
+    for name, id, stored, actual in check():
+        wrong += 1
+        click.echo('%s %d: upcoming/past %d/%d, should be %d/%d' % (
+            (name, id) + stored + actual), err=True)
+    if wrong:
+        raise click.ClickException(
+            '%d counters off, fix with --rebuild' % wrong)
+    click.echo('counters ok')
@@ -0,0 +1,146 @@
+import datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, any_, literal
+from sqlalchemy.dialects import postgresql
+from models import db, Artist, Venue, Show
+import counters
+import fragments
+
+#----------------------------------------------------------------------------#
+# Deleting artists and venues.
+#----------------------------------------------------------------------------#
+# flask delete venues 3 17 42
+# flask delete artists --file ids.txt --soft
+# flask delete artists 17 --restore
+# flask purge --days 30
+#
+# or POST /api/v1/venues/delete with {"ids": [...], "soft": false} and the
+# ADMIN_API_TOKEN (see api.py).
+#
+# Any number of rows goes in one set-based statement. A delete removes the
+# rows, and the database removes their shows (Show's foreign keys are ON
+# DELETE CASCADE). A soft delete only sets deleted_at: the rows and their
+# shows disappear from the site and the API but stay in the tables, until
+# restored or purged (a hard delete of the rows soft-deleted more than some
+# days ago). The show counters of the other side follow both (see
+# counters.py), and cached fragments of the rows are invalidated on commit.
+
+RESOURCES = {
+    # model, Show column referencing it
+    'artists': (Artist, Show.artist_id),
+    'venues': (Venue, Show.venue_id),
+}
+FOREIGN_KEYS = dict(RESOURCES.values())
+
+
+def id_in(column, ids):
+    # a single array parameter on PostgreSQL, whatever the number of ids (an
+    # IN list binds one parameter per id, 65535 at most per statement)
+    if db.session.bind.dialect.name == 'postgresql':
+        return column == any_(literal(ids, postgresql.ARRAY(db.Integer)))
+    return column.in_(ids)
+
+
+def invalidate(model, ids):
+    fragments.changed(*[fragments.tag(model, id) for id in ids])
+
+
+def delete(model, ids, soft=False):
+    """
+    Deletes (or with `soft`, hides) the `model` rows with the given ids and
+    their shows, and commits. Returns (rows deleted or hidden, shows listed
+    until then).
+    """
+    ids = sorted(set(ids))
+    if not ids:
+        return 0, 0
+    table = model.__table__
+    shows = counters.remove_shows_where(id_in(FOREIGN_KEYS[model], ids))
+    if soft:
+        statement = table.update().where(and_(
+            id_in(table.c.id, ids),
+            table.c.deleted_at.is_(None)
+        )).values(deleted_at=datetime.datetime.utcnow())
+    else:
+        statement = table.delete().where(id_in(table.c.id, ids))
+    deleted = db.session.execute(statement).rowcount
+    invalidate(model, ids)
+    db.session.commit()
+    return deleted, shows
+
+
+def restore(model, ids):
+    """
+    Lists the soft-deleted `model` rows with the given ids again, and
+    commits. Returns (rows restored, shows listed again).
+    """
+    table = model.__table__
+    ids = [id for id, in db.session.query(model.id).filter(
+        id_in(model.id, sorted(set(ids))),
+        model.deleted_at.isnot(None)
+    ).with_for_update()]
+    if not ids:
+        return 0, 0
+    db.session.execute(table.update().where(
+        id_in(table.c.id, ids)).values(deleted_at=None))
+    shows = counters.add_shows_where(id_in(FOREIGN_KEYS[model], ids))
+    invalidate(model, ids)
+    db.session.commit()
+    return len(ids), shows
+
+
+def purge(before):
+    """
+    Deletes the artists and venues soft-deleted before `before` (UTC), and
+    their shows, and commits. Returns {resource: rows deleted}.
+    """
+    # their shows are not counted any more, the counters stay as they are
+    purged = {}
+    for resource, (model, _) in sorted(RESOURCES.items()):
+        table = model.__table__
+        purged[resource] = db.session.execute(table.delete().where(
+            table.c.deleted_at < before)).rowcount
+    db.session.commit()
+    return purged
+
+
+@click.command('delete')
+@click.argument('resource', type=click.Choice(sorted(RESOURCES)))
+@click.argument('ids', nargs=-1, type=int)
+@click.option('--file', type=click.File('r'),
+              help='Read the ids from this file, one per line (- for stdin).')
+@click.option('--soft', is_flag=True,
+              help='Hide them from the site, keep their shows.')
+@click.option('--restore', 'undo', is_flag=True,
+              help='List soft-deleted ones again.')
+@with_appcontext
+def delete_command(resource, ids, file, soft, undo):
+    """Delete artists or venues, and their shows."""
+    ids = list(ids)
+    if file is not None:
+        ids += [int(line) for line in file if line.strip()]
+    if not ids:
+        raise click.UsageError('no ids given')
+    model = RESOURCES[resource][0]
+    if undo:
+        rows, shows = restore(model, ids)
+        click.echo('%d %s restored, %d shows listed again' % (
+            rows, resource, shows))
+    else:
+        rows, shows = delete(model, ids, soft=soft)
+        action = 'hidden' if soft else 'deleted'
+        click.echo('%d %s %s, %d shows %s' % (
+            rows, resource, action, shows, action))
+
+
+@click.command('purge')
+@click.option('--days', default=30, show_default=True,
+              help='Purge what was soft-deleted more than this many days ago.')
+@with_appcontext
+def purge_command(days):
+    """Delete soft-deleted artists and venues for good."""
+    purged = purge(datetime.datetime.utcnow() - datetime.timedelta(days=days))
+    click.echo(', '.join('%d %s' % (count, resource)
+                         for resource, count in sorted(purged.items())) +
+               ' purged')
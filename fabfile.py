@@ -7,12 +7,33 @@ from fabric.contrib.console import confirm
 def test():
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python -m unittest discover -p 'test_*.py' -v", capture=True
         )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
 
+def bench(shows='100k', out='bench.json'):
+    # route benchmarks on a scratch database, see benchmarks/bench_routes.py
+    local("python -m benchmarks.bench_routes --shows {} --out {}".format(
+        shows, out))
+
+
+def plans(shows='100k'):
+    # fails when a hot query reads Show with a sequential scan
+    local("python -m benchmarks.check_plans --shows {}".format(shows))
+
+
+def startup(runs=5):
+    # import time, create_app() and first requests of fresh processes
+    local("python -m benchmarks.bench_startup --runs {}".format(runs))
+
+
+def artists(count=500000):
+    # memory per request of /artists, see benchmarks/bench_artists.py
+    local("python -m benchmarks.bench_artists --artists {}".format(count))
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -1,8 +1,8 @@
 from datetime import datetime
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
+from wtforms import StringField, SelectField, SelectMultipleField, DateField, DateTimeField, BooleanField, IntegerField
 from wtforms.fields.simple import TextAreaField
-from wtforms.validators import DataRequired, AnyOf, URL, ValidationError
+from wtforms.validators import DataRequired, AnyOf, URL, NumberRange, Optional, ValidationError
 from wtforms.widgets.core import TextArea
 import re
 
@@ -85,7 +85,6 @@ genres_choices = [
 def validate_phone(self, phone):
     us_phone_num = '^([0-9]{3})[-][0-9]{3}[-][0-9]{4}$'
     match = re.search(us_phone_num, phone.data)
-    print('eeeeeeee')
     if not match:
         raise ValidationError(
             'Error, phone number must be in format xxx-xxx-xxxx')
@@ -103,6 +102,25 @@ class ShowForm(FlaskForm):
         validators=[DataRequired()],
         default=datetime.today()
     )
+    # minutes, see availability.py
+    duration = IntegerField(
+        'duration',
+        validators=[Optional(), NumberRange(min=1, max=1440)],
+        default=120
+    )
+    # recurring shows, see scheduling.py
+    repeat = SelectField(
+        'repeat',
+        choices=[
+            ('', 'Does not repeat'),
+            ('weekly', 'Weekly'),
+            ('monthly', 'Monthly')
+        ],
+        default=''
+    )
+    repeat_until = DateField(
+        'repeat_until', validators=[Optional()]
+    )
 
 
 class VenueForm(FlaskForm):
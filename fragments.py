@@ -0,0 +1,319 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from sqlalchemy import event, inspect, orm
+
+#----------------------------------------------------------------------------#
+# Fragment cache.
+#----------------------------------------------------------------------------#
+# Caches rendered pieces of pages, from templates:
+#
+#   {% cache 'show-tile', show.artist_id, show.start_time,
+#            tags=['Artist:%s' % show.artist_id, 'Venue:%s' % show.venue_id],
+#            ttl=600 %}
+#     ...
+#   {% endcache %}
+#
+# or from views with fragment_cache.cached(key, render, ttl, tags), or get()
+# and set() for strings that are not markup (e.g. JSON, see agenda.py).
+#
+# Every entry carries tags naming the rows it was rendered from ('Venue:3',
+# 'Show:5:2030-01-01 20:00:00') or whole models ('Venue'). Rows written
+# through the ORM are collected when the session flushes and their tags are
+# invalidated once the transaction commits (nothing happens on rollback);
+# ORM bulk updates and deletes invalidate their model's tag. Writes that
+# bypass the ORM call changed() with the tags of what they wrote.
+#
+# FRAGMENT_CACHE_URL picks the backend:
+#   memory://          in-process LRU, bounded by FRAGMENT_CACHE_MAX_BYTES
+#   redis://host/db    shared by all the workers (needs the redis package);
+#                      the byte bound and LRU eviction are the server's
+#                      maxmemory and maxmemory-policy allkeys-lru
+#   (empty)            no shared cache, see below
+# With several worker processes the in-process backend is only invalidated
+# in the worker that made the write, the others serve their copy until its
+# TTL runs out: gunicorn.conf.py refuses memory:// with more than one worker,
+# and production needs redis:// to cache the fragments of templates.
+#
+# Without a backend, get() and set() with local=True still use an
+# in-process cache whose entries live FRAGMENT_CACHE_LOCAL_TTL seconds at
+# most (0 turns it off): it is for entries that may be that stale in the
+# other workers anyway, such as the calendar days (see agenda.py).
+
+PENDING = 'fragment_tags'
+
+
+class MemoryBackend(object):
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # key -> (value, expires, tags, size in bytes), least recently used first
+        self.entries = OrderedDict()
+        self.tags = {}  # tag -> keys
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl, tags):
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, time.monotonic() + ttl, tags, size)
+            self.bytes += size
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(key)
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate(self, tags):
+        with self.lock:
+            for tag in tags:
+                for key in self.tags.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tags.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        _, _, tags, size = entry
+        self.bytes -= size
+        for tag in tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+
+class RedisBackend(object):
+    # each tag is a set of the keys rendered from it
+
+    def __init__(self, url):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.redis.get(key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, value, ttl, tags):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.set(key, value.encode('utf-8'), ex=ttl)
+        for tag in tags:
+            pipe.sadd('tag:' + tag, key)
+            pipe.expire('tag:' + tag, ttl)
+        pipe.execute()
+
+    def invalidate(self, tags):
+        for tag in tags:
+            keys = self.redis.smembers('tag:' + tag)
+            self.redis.delete('tag:' + tag, *keys)
+
+    def clear(self):
+        self.redis.flushdb()
+
+
+def create_backend(url, max_bytes):
+    if not url:
+        return None
+    if url.startswith('memory:'):
+        return MemoryBackend(max_bytes)
+    if url.startswith(('redis:', 'rediss:', 'unix:')):
+        return RedisBackend(url)
+    raise ValueError('unknown FRAGMENT_CACHE_URL %r' % url)
+
+
+class FragmentCache(object):
+
+    def __init__(self):
+        self._backends = {}
+        self._local = {}
+
+    @property
+    def backend(self):
+        return self._backends.get(current_app._get_current_object())
+
+    @property
+    def local(self):
+        # the per-process cache of local=True entries when there is no backend
+        return self._local.get(current_app._get_current_object())
+
+    def key(self, parts):
+        return 'fragment:%s:%s' % (current_app.config['FRAGMENT_CACHE_SALT'],
+                                   ':'.join(str(part) for part in parts))
+
+    def cached(self, key, render, ttl=None, tags=()):
+        # the cached fragment for `key` (a string or a tuple), or render()
+        if self.backend is None:
+            return render()
+        if not isinstance(key, (tuple, list)):
+            key = (key,)
+        value = self.get(key)
+        if value is None:
+            value = str(render())
+            self.set(key, value, ttl, tags)
+        return Markup(value)
+
+    def get(self, key, local=False):
+        # the cached string for `key` (a tuple), None if there is none
+        backend = self.backend
+        if backend is None and local:
+            backend = self.local
+        if backend is None:
+            return None
+        return backend.get(self.key(key))
+
+    def set(self, key, value, ttl=None, tags=(), local=False):
+        ttl = ttl or current_app.config['FRAGMENT_CACHE_TTL']
+        backend = self.backend
+        if backend is None and local:
+            backend = self.local
+            ttl = min(ttl, current_app.config['FRAGMENT_CACHE_LOCAL_TTL'])
+        if backend is not None:
+            backend.set(self.key(key), value, ttl, tuple(tags))
+
+    def invalidate(self, *tags):
+        for backend in (self.backend, self.local):
+            if backend is not None and tags:
+                backend.invalidate(tags)
+
+    def clear(self):
+        for backend in (self.backend, self.local):
+            if backend is not None:
+                backend.clear()
+
+    def init_app(self, app):
+        from conditional import template_digest
+        app.config.setdefault('FRAGMENT_CACHE_URL', 'memory://')
+        app.config.setdefault('FRAGMENT_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+        app.config.setdefault('FRAGMENT_CACHE_TTL', 300)
+        app.config.setdefault('FRAGMENT_CACHE_LOCAL_TTL', 10)
+        # a deploy changing the templates doesn't serve the old markup
+        app.config['FRAGMENT_CACHE_SALT'] = hashlib.md5((
+            app.config.get('RELEASE', '') + template_digest(app)
+        ).encode('utf-8')).hexdigest()[:12]
+        self._backends[app] = create_backend(
+            app.config['FRAGMENT_CACHE_URL'],
+            app.config['FRAGMENT_CACHE_MAX_BYTES'])
+        self._local[app] = None
+        if self._backends[app] is None and \
+                app.config['FRAGMENT_CACHE_LOCAL_TTL'] > 0:
+            self._local[app] = MemoryBackend(
+                app.config['FRAGMENT_CACHE_MAX_BYTES'])
+        app.jinja_env.add_extension(CacheExtension)
+        app.jinja_env.fragment_cache = self
+
+        if not event.contains(orm.Session, 'after_flush', collect_flushed):
+            event.listen(orm.Session, 'after_flush', collect_flushed)
+            event.listen(orm.Session, 'after_bulk_update', collect_bulk)
+            event.listen(orm.Session, 'after_bulk_delete', collect_bulk)
+            event.listen(orm.Session, 'after_commit', invalidate_committed)
+            event.listen(orm.Session, 'after_soft_rollback', forget_pending)
+
+
+fragment_cache = FragmentCache()
+
+
+#----------------------------------------------------------------------------#
+# Invalidation.
+#----------------------------------------------------------------------------#
+
+def tag(model, *pk):
+    # 'Venue:3', 'Show:5:2030-01-01 20:00:00'
+    return ':'.join([model.__name__] + [str(value) for value in pk])
+
+
+def row_tag(obj):
+    mapper = inspect(obj).mapper
+    return tag(mapper.class_, *mapper.primary_key_from_instance(obj))
+
+
+def changed(*tags, **kwargs):
+    # tags to invalidate when the session commits
+    from models import db
+    session = kwargs.get('session') or db.session
+    session.info.setdefault(PENDING, set()).update(tags)
+
+
+def collect_flushed(session, flush_context):
+    tags = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tags.add(row_tag(obj))
+    if tags:
+        changed(*tags, session=session)
+
+
+def collect_bulk(context):
+    changed(context.mapper.class_.__name__, session=context.session)
+
+
+def invalidate_committed(session):
+    tags = session.info.pop(PENDING, None)
+    if tags:
+        fragment_cache.invalidate(*tags)
+
+
+def forget_pending(session, previous_transaction):
+    # the outermost transaction rolled back: its writes never happened
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING, None)
+
+
+#----------------------------------------------------------------------------#
+# Jinja.
+#----------------------------------------------------------------------------#
+
+class CacheExtension(Extension):
+    # {% cache key, ..., tags=[...], ttl=seconds %}...{% endcache %}
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = []
+        options = {}
+        while parser.stream.current.type != 'block_end':
+            if parts or options:
+                parser.stream.expect('comma')
+            if parser.stream.current.type == 'name' and \
+                    parser.stream.look().type == 'assign':
+                name = next(parser.stream).value
+                next(parser.stream)
+                options[name] = parser.parse_expression()
+            else:
+                parts.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        args = [
+            nodes.List(parts),
+            options.get('tags', nodes.List([])),
+            options.get('ttl', nodes.Const(None)),
+        ]
+        return nodes.CallBlock(self.call_method('_cache', args),
+                               [], [], body).set_lineno(lineno)
+
+    def _cache(self, parts, tags, ttl, caller):
+        return self.environment.fragment_cache.cached(
+            tuple(parts), caller, ttl=ttl, tags=tags)
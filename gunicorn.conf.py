@@ -0,0 +1,73 @@
+import gc
+import multiprocessing
+import os
+
+#----------------------------------------------------------------------------#
+# Gunicorn settings.
+#----------------------------------------------------------------------------#
+#   gunicorn wsgi:app
+# reads this file from the working directory. PORT and WEB_CONCURRENCY
+# override the address and the number of workers.
+#
+# Every worker has its own database pool (DB_POOL_SIZE + DB_MAX_OVERFLOW
+# connections, see config.py): keep workers * that below the server's
+# max_connections.
+
+bind = '0.0.0.0:%s' % os.environ.get('PORT', '8000')
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# one request at a time per worker, the views block on the database
+worker_class = 'sync'
+timeout = 30
+graceful_timeout = 30
+keepalive = 5  # behind a load balancer reusing its connections
+
+# the app is imported once, in the master, and the workers are forked from
+# it: they start at once and share the pages of the imported modules
+# (copy-on-write) instead of each importing its own copy
+preload_app = True
+
+# recycle workers now and then, not all at the same time, to bound memory
+# growth
+max_requests = 2000
+max_requests_jitter = 200
+
+# the heartbeat files, on tmpfs rather than a disk that may stall
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    # an in-process fragment cache is only invalidated in the worker that
+    # wrote, the other workers would keep serving stale fragments
+    url = server.app.wsgi().config['FRAGMENT_CACHE_URL']
+    if url.startswith('memory:') and server.cfg.workers > 1:
+        raise RuntimeError('FRAGMENT_CACHE_URL=%s with %d workers: use '
+                           'redis:// or leave it empty' % (
+                               url, server.cfg.workers))
+    if not url:
+        server.log.warning('FRAGMENT_CACHE_URL is not set: no template '
+                           'fragment is cached, the calendar days only in '
+                           'each worker (FRAGMENT_CACHE_LOCAL_TTL)')
+
+
+def pre_fork(server, worker):
+    # move what the master allocated out of the collector's reach: a
+    # collection in a worker would otherwise write to (and so copy) every
+    # page holding a tracked object
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # connections opened by the master must not be shared by the workers
+    from models import db
+    with server.app.wsgi().app_context():
+        db.engine.dispose()
+
+
+def child_exit(server, worker):
+    # the dead worker's live gauges leave /metrics, see metrics.py
+    if 'prometheus_multiproc_dir' in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,110 @@
+import threading
+import time
+from flask import Blueprint, jsonify
+from sqlalchemy import exc, text
+from sqlalchemy.pool import QueuePool
+from models import db
+
+health = Blueprint('health', __name__)
+
+#----------------------------------------------------------------------------#
+# Pool instrumentation.
+#----------------------------------------------------------------------------#
+# QueuePool that records how long every checkout waited for a connection
+# (including opening a new one when the pool has room to grow),
+# so /healthz can tell whether workers are starved of connections.
+
+
+class PoolWaits(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds, timed_out=False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_total_ms': round(self.total * 1000, 3),
+                'wait_avg_ms': round(self.total * 1000 / self.checkouts, 3)
+                if self.checkouts else 0.0,
+                'wait_max_ms': round(self.max * 1000, 3),
+            }
+
+
+pool_waits = PoolWaits()
+
+
+class TimedQueuePool(QueuePool):
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super(TimedQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            pool_waits.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_waits.record(time.perf_counter() - start)
+        return connection
+
+
+def pool_status():
+    pool = db.engine.pool
+    status = {'class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(0, pool.overflow()),
+            'max_overflow': pool._max_overflow,
+        })
+    status.update(pool_waits.as_dict())
+    return status
+
+
+#----------------------------------------------------------------------------#
+# Probes.
+#----------------------------------------------------------------------------#
+
+@health.route('/healthz')
+def healthz():
+    # liveness: the process serves requests; never touches the database
+    return jsonify({'status': 'ok', 'pool': pool_status()})
+
+
+@health.route('/readyz')
+def readyz():
+    # readiness: a primary connection can be checked out and answers a query
+    try:
+        db.session.execute(text('SELECT 1'), bind=db.engine)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'status': 'unavailable',
+            'error': e.__class__.__name__,
+            'pool': pool_status()
+        }), 503
+    return jsonify({'status': 'ok', 'pool': pool_status()})
+
+
+def init_app(app):
+    # use the timed pool wherever a QueuePool would be used
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if 'pool_size' in options:
+        options.setdefault('poolclass', TimedQueuePool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    app.register_blueprint(health)
@@ -0,0 +1,228 @@
+import csv
+import json
+import time
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import tuple_
+from werkzeug.datastructures import MultiDict
+from forms import ArtistForm, VenueForm, ShowForm
+from models import db, Artist, Venue, Show
+from agenda import day_tag
+from availability import EARLIEST, LATEST_SHOW
+import counters
+import fragments
+from pagination import parse_datetime
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+# flask import artists artists.csv
+# flask import venues venues.ndjson --batch-size 5000
+# flask import shows shows.ndjson
+#
+# Every line is validated with the same forms the site uses (phone format,
+# URLs, state and genre choices). Invalid lines are reported on stderr and
+# skipped, the rest is written in batches: one SELECT reads the rows whose
+# natural keys already exist, then new rows are inserted and changed rows
+# updated with one executemany each. Rows the file leaves as they are are
+# not written (that would bump updated_at, so their ETags, and drop their
+# cached fragments): running the same file twice writes nothing.
+
+RESOURCES = {
+    # model, form, natural key
+    'artists': (Artist, ArtistForm, ('name', 'city', 'state')),
+    'venues': (Venue, VenueForm, ('name', 'address', 'city', 'state')),
+    'shows': (Show, ShowForm, ('artist_id', 'start_time')),
+}
+
+
+def read_lines(file, format):
+    # yields (line number, dict) pairs, the dict is None for unreadable lines
+    if format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else None
+
+
+def to_formdata(row):
+    formdata = MultiDict()
+    for name, value in row.items():
+        if value is None:
+            continue
+        if name == 'genres' and isinstance(value, str):
+            value = [g.strip() for g in value.strip('{}').split(',') if g.strip()]
+        if isinstance(value, list):
+            for item in value:
+                formdata.add(name, item)
+        elif isinstance(value, bool):
+            formdata.add(name, 'true' if value else 'false')
+        else:
+            formdata.add(name, str(value))
+    return formdata
+
+
+def validate(form_class, model, row):
+    # returns (values, None) or (None, errors)
+    start_time = None
+    if form_class is ShowForm and row.get('start_time'):
+        # ISO 8601 (as written by /api/v1/export/shows.ndjson) is accepted,
+        # the form is given the same time in its own format
+        try:
+            start_time = parse_datetime(str(row['start_time']))
+        except ValueError:
+            return None, {'start_time': ['Not a valid datetime value']}
+        if not EARLIEST <= start_time <= LATEST_SHOW:
+            # its slot would overflow, see availability.py
+            return None, {'start_time': ['Out of range']}
+        row = dict(row, start_time=start_time.strftime('%Y-%m-%d %H:%M:%S'))
+
+    form = form_class(to_formdata(row), meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+
+    values = {
+        name: value for name, value in form.data.items()
+        if name in model.__table__.columns
+    }
+    if start_time is not None:
+        values['start_time'] = start_time
+    if model is Show:
+        try:
+            values['artist_id'] = int(values['artist_id'])
+            values['venue_id'] = int(values['venue_id'])
+        except (TypeError, ValueError):
+            return None, {'artist_id/venue_id': ['must be integers']}
+    return values, None
+
+
+def missing_references(batch):
+    # (line, values) pairs of shows whose artist or venue does not exist (or
+    # is soft-deleted, its shows would not be counted, see counters.py)
+    artist_ids = {values['artist_id'] for _, values in batch}
+    venue_ids = {values['venue_id'] for _, values in batch}
+    artists = {id for id, in db.session.query(Artist.id).
+               filter(Artist.id.in_(artist_ids), Artist.deleted_at.is_(None))}
+    venues = {id for id, in db.session.query(Venue.id).
+              filter(Venue.id.in_(venue_ids), Venue.deleted_at.is_(None))}
+    return [(line, values) for line, values in batch
+            if values['artist_id'] not in artists
+            or values['venue_id'] not in venues]
+
+
+def write_batch(model, key, batch):
+    # upserts one batch keyed on `key`, returns (inserted, updated)
+    rows = {}
+    for _, values in batch:  # the last line wins for repeated keys
+        rows[tuple(values[k] for k in key)] = values
+
+    # the stored values of the primary key and of the columns written (the
+    # venue of existing shows is also needed for the counters of moved shows)
+    table = model.__table__
+    pk = [c.key for c in table.primary_key]
+    names = list(next(iter(rows.values())))
+    selected = pk + [name for name in names if name not in pk]
+    columns = [getattr(model, k) for k in key]
+    existing = {}
+    for row in db.session.query(*[table.c[name] for name in selected]).\
+            filter(tuple_(*columns).in_(list(rows))):
+        row = dict(zip(selected, row))
+        existing[tuple(row[k] for k in key)] = row
+
+    inserts = [values for k, values in rows.items() if k not in existing]
+    updates = [values for k, values in rows.items() if k in existing and any(
+        values[name] != existing[k][name] for name in names)]
+    if model is Show:
+        # (show, the venue it was at) for the shows moved to another venue
+        moved = [(values, existing[tuple(values[k] for k in key)]['venue_id'])
+                 for values in updates]
+        moved = [(values, venue_id) for values, venue_id in moved
+                 if values['venue_id'] != venue_id]
+        counters.remove_shows([dict(values, venue_id=venue_id)
+                               for values, venue_id in moved])
+        counters.add_shows(inserts + [values for values, _ in moved])
+        # the cached calendar days (see agenda.py)
+        fragments.changed(*{day_tag(values['start_time'].date())
+                            for values in inserts + updates})
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+    if updates:
+        if model is not Show:
+            for values in updates:
+                values['id'] = existing[tuple(values[k] for k in key)]['id']
+        db.session.bulk_update_mappings(model, updates)
+        # bulk updates skip the session's flush events
+        fragments.changed(*[
+            fragments.tag(model, *[values[k] for k in pk]) for values in updates])
+    db.session.commit()
+    return len(inserts), len(updates)
+
+
+def import_file(resource, file, format, batch_size):
+    model, form_class, key = RESOURCES[resource]
+    inserted = updated = rejected = 0
+    started = time.perf_counter()
+
+    def reject(line, errors):
+        click.echo('line %d rejected: %s' % (line, errors), err=True)
+
+    def flush(batch):
+        nonlocal inserted, updated, rejected
+        if model is Show:
+            missing = missing_references(batch)
+            for line, values in missing:
+                reject(line, {'artist_id/venue_id': ['does not exist']})
+            rejected += len(missing)
+            missing_lines = {line for line, _ in missing}
+            batch = [(l, v) for l, v in batch if l not in missing_lines]
+        if batch:
+            i, u = write_batch(model, key, batch)
+            inserted += i
+            updated += u
+
+    batch = []
+    for line, row in read_lines(file, format):
+        if row is None:
+            reject(line, 'not a JSON object')
+            rejected += 1
+            continue
+        values, errors = validate(form_class, model, row)
+        if errors:
+            reject(line, errors)
+            rejected += 1
+            continue
+        batch.append((line, values))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    elapsed = time.perf_counter() - started
+    total = inserted + updated
+    click.echo('%s: %d inserted, %d updated, %d rejected in %.2fs (%d rows/sec)' % (
+        resource, inserted, updated, rejected, elapsed,
+        total / elapsed if elapsed else total))
+    return inserted, updated, rejected
+
+
+@click.command('import')
+@click.argument('resource', type=click.Choice(sorted(RESOURCES)))
+@click.argument('file', type=click.File('r', encoding='utf-8'))
+@click.option('--format', type=click.Choice(['csv', 'ndjson']),
+              help='Defaults to the file extension.')
+@click.option('--batch-size', default=1000, show_default=True)
+@with_appcontext
+def import_command(resource, file, format, batch_size):
+    """Bulk import artists, venues or shows from CSV or NDJSON."""
+    if format is None:
+        format = 'ndjson' if file.name.endswith(('.ndjson', '.jsonl')) else 'csv'
+    import_file(resource, file, format, batch_size)
@@ -0,0 +1,99 @@
+import json
+import re
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# Per-request SQL instrumentation.
+#----------------------------------------------------------------------------#
+# Every statement run while serving a request (on the primary or a replica)
+# is counted and timed. The totals are sent back in a Server-Timing header
+# and logged as one JSON line per request.
+#
+# Statements are reduced to their shape (whitespace and IN lists collapsed).
+# When one shape runs more than N_PLUS_ONE_THRESHOLD times in a request, a
+# loop is most likely issuing a query per row (N+1): this is logged as a
+# warning, and raised as an error when the app is TESTING.
+
+IN_LIST = re.compile(r'IN \((?:[^()]*?)\)', re.IGNORECASE)
+SPACES = re.compile(r'\s+')
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def statement_shape(statement):
+    return IN_LIST.sub('IN (...)', SPACES.sub(' ', statement)).strip()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    if has_request_context() and 'sql_queries' in g:
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+    if not (has_request_context() and 'sql_queries' in g):
+        return
+    starts = conn.info.get('query_start')
+    if starts:
+        g.sql_time += time.perf_counter() - starts.pop()
+    g.sql_queries += 1
+    g.sql_shapes[statement_shape(statement)] += 1
+
+
+def init_app(app):
+    app.config.setdefault('SQL_INSTRUMENTATION', True)
+    app.config.setdefault('N_PLUS_ONE_THRESHOLD', 10)
+    if not app.config['SQL_INSTRUMENTATION']:
+        return
+
+    # every engine, so replicas are covered as well
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+    @app.before_request
+    def start_sql_stats():
+        g.sql_queries = 0
+        g.sql_time = 0.0
+        g.sql_shapes = Counter()
+
+    @app.after_request
+    def report_sql_stats(response):
+        if 'sql_queries' not in g:
+            return response
+        db_ms = g.sql_time * 1000
+        response.headers.add(
+            'Server-Timing',
+            'db;dur=%.2f;desc="%d queries"' % (db_ms, g.sql_queries))
+
+        threshold = app.config['N_PLUS_ONE_THRESHOLD']
+        repeated = {
+            shape: count for shape, count in g.sql_shapes.items()
+            if count > threshold
+        }
+        app.logger.info(json.dumps({
+            'event': 'sql',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'queries': g.sql_queries,
+            'db_ms': round(db_ms, 2),
+            'repeated': repeated,
+        }))
+        if repeated:
+            message = '%s: %d statement shape(s) repeated more than %d times ' \
+                '(N+1?): %s' % (request.endpoint, len(repeated), threshold,
+                                 '; '.join('%dx %s' % (count, shape)
+                                           for shape, count in repeated.items()))
+            if app.testing:
+                raise NPlusOneError(message)
+            app.logger.warning(message)
+        return response
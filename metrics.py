@@ -0,0 +1,96 @@
+import os
+import time
+from flask import g, request, Response, before_render_template, template_rendered
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    CONTENT_TYPE_LATEST,
+    generate_latest
+)
+from prometheus_client import multiprocess
+
+#----------------------------------------------------------------------------#
+# Prometheus metrics.
+#----------------------------------------------------------------------------#
+# Served at /metrics. With several pre-forked workers, point the
+# prometheus_multiproc_dir environment variable at an empty directory shared
+# by all of them (wiped before startup): every worker then writes its values
+# to mmap'd files there and /metrics aggregates all the workers, whichever
+# one answers the scrape.
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    'fyyur_request_duration_seconds', 'Request latency by endpoint',
+    ['endpoint', 'method'], buckets=LATENCY_BUCKETS)
+REQUESTS = Counter(
+    'fyyur_requests_total', 'Requests by endpoint and status code',
+    ['endpoint', 'method', 'status'])
+IN_FLIGHT = Gauge(
+    'fyyur_requests_in_flight', 'Requests being served',
+    multiprocess_mode='livesum')
+TEMPLATE_RENDER = Histogram(
+    'fyyur_template_render_seconds', 'Template render time',
+    ['template'], buckets=LATENCY_BUCKETS)
+DB_TIME = Histogram(
+    'fyyur_request_db_seconds', 'Time spent in SQL per request',
+    ['endpoint'], buckets=LATENCY_BUCKETS)
+DB_QUERIES = Histogram(
+    'fyyur_request_queries', 'SQL statements per request',
+    ['endpoint'], buckets=(0, 1, 2, 5, 10, 20, 50, 100))
+
+
+def endpoint_label():
+    return request.endpoint or 'unmatched'
+
+
+def metrics():
+    if 'prometheus_multiproc_dir' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def on_before_render(app, template, context, **extra):
+    g.setdefault('render_starts', []).append(time.perf_counter())
+
+
+def on_rendered(app, template, context, **extra):
+    starts = g.get('render_starts')
+    if starts:
+        TEMPLATE_RENDER.labels(template.name or 'string').observe(
+            time.perf_counter() - starts.pop())
+
+
+def init_app(app):
+    app.add_url_rule('/metrics', 'metrics', metrics)
+    before_render_template.connect(on_before_render, app)
+    template_rendered.connect(on_rendered, app)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_start = time.perf_counter()
+        IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'request_start' not in g:
+            return response
+        endpoint = endpoint_label()
+        REQUEST_LATENCY.labels(endpoint, request.method).observe(
+            time.perf_counter() - g.request_start)
+        REQUESTS.labels(endpoint, request.method, response.status_code).inc()
+        if 'sql_queries' in g:  # see instrumentation.py
+            DB_TIME.labels(endpoint).observe(g.sql_time)
+            DB_QUERIES.labels(endpoint).observe(g.sql_queries)
+        return response
+
+    @app.teardown_request
+    def end_request_metrics(exc):
+        if g.pop('request_start', None) is not None:
+            IN_FLIGHT.dec()
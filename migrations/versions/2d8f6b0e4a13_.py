@@ -0,0 +1,32 @@
+"""updated_at on Artist, Venue and Show
+
+Revision ID: 2d8f6b0e4a13
+Revises: 9a3e5c7f1b28
+Create Date: 2026-10-18 18:12:44.207316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d8f6b0e4a13'
+down_revision = '9a3e5c7f1b28'
+branch_labels = None
+depends_on = None
+
+TABLES = ['Artist', 'Venue', 'Show']
+
+
+def upgrade():
+    # existing rows count as modified now; the application sets the
+    # column itself on every insert and update (UTC)
+    for table in TABLES:
+        op.add_column(table, sa.Column(
+            'updated_at', sa.DateTime(), nullable=False,
+            server_default=sa.text("(now() at time zone 'utc')")))
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,36 @@
+"""trigram search indexes on Venue and Artist name/city
+
+Revision ID: 3f1c9a6e52d7
+Revises: adb04444c78d
+Create Date: 2026-10-18 10:02:11.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a6e52d7'
+down_revision = 'adb04444c78d'
+branch_labels = None
+depends_on = None
+
+TRGM_INDEXES = [
+    ('ix_Venue_name_trgm', 'Venue', 'name'),
+    ('ix_Venue_city_trgm', 'Venue', 'city'),
+    ('ix_Artist_name_trgm', 'Artist', 'name'),
+    ('ix_Artist_city_trgm', 'Artist', 'city'),
+]
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRGM_INDEXES:
+        op.create_index(name, table, [column], unique=False,
+                        postgresql_using='gin',
+                        postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    for name, table, column in TRGM_INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,49 @@
+"""upcoming/past show counters on Artist and Venue
+
+Revision ID: 9a3e5c7f1b28
+Revises: e4b7d2a91c06
+Create Date: 2026-10-18 16:41:09.532871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3e5c7f1b28'
+down_revision = 'e4b7d2a91c06'
+branch_labels = None
+depends_on = None
+
+TARGETS = [('Artist', 'artist_id'), ('Venue', 'venue_id')]
+
+
+def upgrade():
+    op.create_table('CounterSweep',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('swept_at', sa.DateTime(), nullable=False),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.execute('INSERT INTO "CounterSweep" (id, swept_at) '
+               'VALUES (1, LOCALTIMESTAMP)')
+    for table, fk in TARGETS:
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+        # same as `flask counters check --rebuild`
+        op.execute(
+            'UPDATE "{table}" SET '
+            'upcoming_shows_count = (SELECT count(*) FROM "Show" s, '
+            '"CounterSweep" c WHERE s.{fk} = "{table}".id '
+            'AND s.start_time > c.swept_at), '
+            'past_shows_count = (SELECT count(*) FROM "Show" s, '
+            '"CounterSweep" c WHERE s.{fk} = "{table}".id '
+            'AND s.start_time <= c.swept_at)'.format(table=table, fk=fk))
+
+
+def downgrade():
+    for table, fk in TARGETS:
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
+    op.drop_table('CounterSweep')
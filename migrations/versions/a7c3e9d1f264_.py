@@ -0,0 +1,42 @@
+"""(lower(name), id) indexes of the listed Artist and Venue rows
+
+Revision ID: a7c3e9d1f264
+Revises: f2b8d61c4a57
+Create Date: 2026-10-19 02:18:44.903617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9d1f264'
+down_revision = 'f2b8d61c4a57'
+branch_labels = None
+depends_on = None
+
+TABLES = ['Artist', 'Venue']
+
+
+def upgrade():
+    # the listings page on lower(name): the (name, id) indexes are replaced,
+    # CONCURRENTLY as in e4b7d2a91c06
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index('ix_{}_lower_name_id'.format(table), table,
+                            [sa.text('lower(name)'), 'id'], unique=False,
+                            postgresql_where=sa.text('deleted_at IS NULL'),
+                            postgresql_concurrently=True)
+            op.drop_index('ix_{}_name_id'.format(table), table_name=table,
+                          postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index('ix_{}_name_id'.format(table), table,
+                            ['name', 'id'], unique=False,
+                            postgresql_where=sa.text('deleted_at IS NULL'),
+                            postgresql_concurrently=True)
+            op.drop_index('ix_{}_lower_name_id'.format(table),
+                          table_name=table, postgresql_concurrently=True)
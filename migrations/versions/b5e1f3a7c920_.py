@@ -0,0 +1,67 @@
+"""ON DELETE CASCADE on Show, deleted_at on Artist and Venue
+
+Revision ID: b5e1f3a7c920
+Revises: 2d8f6b0e4a13
+Create Date: 2026-10-18 20:27:51.604418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e1f3a7c920'
+down_revision = '2d8f6b0e4a13'
+branch_labels = None
+depends_on = None
+
+FOREIGN_KEYS = [
+    ('Show_artist_id_fkey', 'artist_id', 'Artist'),
+    ('Show_venue_id_fkey', 'venue_id', 'Venue'),
+]
+TABLES = ['Artist', 'Venue']
+
+
+def replace_foreign_keys(on_delete):
+    # each constraint is swapped in one statement, so the table is never
+    # without it. NOT VALID only holds the lock for an instant; the existing
+    # rows are checked by validate_foreign_keys() once that lock is released
+    for name, column, table in FOREIGN_KEYS:
+        op.execute(
+            'ALTER TABLE "Show" DROP CONSTRAINT "{name}", '
+            'ADD CONSTRAINT "{name}" FOREIGN KEY ({column}) '
+            'REFERENCES "{table}" (id){on_delete} NOT VALID'.format(
+                name=name, column=column, table=table, on_delete=on_delete))
+
+
+def validate_foreign_keys():
+    # outside of the migration's transaction, without blocking writes
+    for name, _, _ in FOREIGN_KEYS:
+        op.execute('ALTER TABLE "Show" VALIDATE CONSTRAINT "{}"'.format(name))
+
+
+def upgrade():
+    replace_foreign_keys(' ON DELETE CASCADE')
+    for table in TABLES:
+        op.add_column(table, sa.Column('deleted_at', sa.DateTime(),
+                                       nullable=True))
+    # only the soft-deleted rows are indexed. CONCURRENTLY, as in e4b7d2a91c06
+    with op.get_context().autocommit_block():
+        validate_foreign_keys()
+        for table in TABLES:
+            op.create_index('ix_{}_deleted_at'.format(table), table,
+                            ['deleted_at'], unique=False,
+                            postgresql_where=sa.text('deleted_at IS NOT NULL'),
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.drop_index('ix_{}_deleted_at'.format(table), table_name=table,
+                          postgresql_concurrently=True)
+    for table in TABLES:
+        op.drop_column(table, 'deleted_at')
+    replace_foreign_keys('')
+    with op.get_context().autocommit_block():
+        validate_foreign_keys()
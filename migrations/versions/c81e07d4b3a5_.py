@@ -0,0 +1,47 @@
+"""store genres as a native array with GIN indexes
+
+Revision ID: c81e07d4b3a5
+Revises: 3f1c9a6e52d7
+Create Date: 2026-10-18 11:20:47.903318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81e07d4b3a5'
+down_revision = '3f1c9a6e52d7'
+branch_labels = None
+depends_on = None
+
+# existing rows hold a Postgres array literal such as '{Jazz,"Rock n Roll"}'
+# in a varchar, which casts straight to an array; anything else becomes a
+# one element array
+TO_ARRAY = """
+    CASE
+        WHEN genres IS NULL THEN NULL
+        WHEN genres LIKE '{%}' THEN genres::varchar(120)[]
+        ELSE ARRAY[genres]::varchar(120)[]
+    END
+"""
+
+
+def upgrade():
+    for table in ('Artist', 'Venue'):
+        op.alter_column(table, 'genres',
+                        existing_type=sa.String(length=300),
+                        type_=postgresql.ARRAY(sa.String(length=120)),
+                        postgresql_using=TO_ARRAY)
+        op.create_index('ix_%s_genres' % table, table, ['genres'],
+                        unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_index('ix_%s_genres' % table, table_name=table)
+        op.alter_column(table, 'genres',
+                        existing_type=postgresql.ARRAY(sa.String(length=120)),
+                        type_=sa.String(length=300),
+                        postgresql_using='genres::varchar(300)')
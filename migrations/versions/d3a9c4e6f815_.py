@@ -0,0 +1,40 @@
+"""duration of shows, interval index of venue bookings
+
+Revision ID: d3a9c4e6f815
+Revises: b5e1f3a7c920
+Create Date: 2026-10-18 23:12:40.118325
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a9c4e6f815'
+down_revision = 'b5e1f3a7c920'
+branch_labels = None
+depends_on = None
+
+SHOW_SLOT = "tsrange(start_time, start_time + duration * interval '1 minute')"
+
+
+def upgrade():
+    # btree_gist: venue_id (an integer) in the GiST index
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    # a constant default, no table rewrite
+    op.add_column('Show', sa.Column('duration', sa.Integer(), nullable=False,
+                                    server_default='120'))
+    # NOT VALID, the rows are checked outside the transaction (see b5e1f3a7c920)
+    op.execute('ALTER TABLE "Show" ADD CONSTRAINT "ck_Show_duration" '
+               'CHECK (duration > 0 AND duration <= 1440) NOT VALID')
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE "Show" VALIDATE CONSTRAINT "ck_Show_duration"')
+        op.execute('CREATE INDEX CONCURRENTLY "ix_Show_venue_slot" ON "Show" '
+                   'USING gist (venue_id, {})'.format(SHOW_SLOT))
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY "ix_Show_venue_slot"')
+    op.drop_constraint('ck_Show_duration', 'Show', type_='check')
+    op.drop_column('Show', 'duration')
@@ -0,0 +1,38 @@
+"""Show indexes on (venue_id, start_time) and (start_time, artist_id)
+
+Revision ID: e4b7d2a91c06
+Revises: c81e07d4b3a5
+Create Date: 2026-10-18 14:05:32.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7d2a91c06'
+down_revision = 'c81e07d4b3a5'
+branch_labels = None
+depends_on = None
+
+SHOW_INDEXES = [
+    ('ix_Show_venue_id_start_time', ['venue_id', 'start_time']),
+    ('ix_Show_start_time', ['start_time', 'artist_id']),
+]
+
+
+# CONCURRENTLY doesn't lock the table against writes while the index is
+# built, but can't run inside a transaction. If a build fails it leaves an
+# INVALID index behind: drop it before running the migration again.
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in SHOW_INDEXES:
+            op.create_index(name, 'Show', columns, unique=False,
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in SHOW_INDEXES:
+            op.drop_index(name, table_name='Show',
+                          postgresql_concurrently=True)
@@ -0,0 +1,35 @@
+"""(name, id) indexes of the listed Artist and Venue rows
+
+Revision ID: f2b8d61c4a57
+Revises: d3a9c4e6f815
+Create Date: 2026-10-19 00:41:07.562194
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d61c4a57'
+down_revision = 'd3a9c4e6f815'
+branch_labels = None
+depends_on = None
+
+TABLES = ['Artist', 'Venue']
+
+
+def upgrade():
+    # CONCURRENTLY, as in e4b7d2a91c06
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index('ix_{}_name_id'.format(table), table,
+                            ['name', 'id'], unique=False,
+                            postgresql_where=sa.text('deleted_at IS NULL'),
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.drop_index('ix_{}_name_id'.format(table), table_name=table,
+                          postgresql_concurrently=True)
@@ -1,15 +1,20 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+import datetime
+import sqlite3
+from sqlalchemy import DDL, event
+from sqlalchemy.engine import Engine
+from routing import RoutingSQLAlchemy
 
 
-app = Flask(__name__)
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)  # link to the Flask app models and database
+# bound to the app by create_app(), see app.py
+db = RoutingSQLAlchemy()  # GET requests read from replicas, see routing.py
 
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
+
+# genres are stored as a native array (GIN indexed) on PostgreSQL,
+# and as a JSON list on SQLite, which has no array type
+Genres = db.ARRAY(db.String(120)).with_variant(db.JSON(), 'sqlite')
 # TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 
 
@@ -23,40 +28,111 @@ class Show(db.Model):  # Association Table
                     3- also enable different artists to present shows in the same venue at the same time (working as a group)
     """
     __tablename__ = 'Show'
-    # parent id
+    __table_args__ = (
+        # venue pages, and deleting a venue's shows (venue_id = x)
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        # date ranges and the /shows listing, in its (start_time, artist_id)
+        # order
+        db.Index('ix_Show_start_time', 'start_time', 'artist_id'),
+        # the longest show is a day, see availability.py
+        db.CheckConstraint('duration > 0 AND duration <= 1440',
+                           name='ck_Show_duration'),
+    )
+    # parent id, deleting an artist or a venue deletes its shows
     artist_id = db.Column(db.Integer, db.ForeignKey
-                          ('Artist.id'), primary_key=True)
+                          ('Artist.id', ondelete='CASCADE'), primary_key=True)
     # child id
-    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'))
+    venue_id = db.Column(db.Integer, db.ForeignKey(
+        'Venue.id', ondelete='CASCADE'))
     # extra_data
     start_time = db.Column(db.DateTime, primary_key=True)
+    # minutes the show holds the venue from start_time
+    duration = db.Column(db.Integer, nullable=False, default=120,
+                         server_default='120')
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.datetime.utcnow,
+                           onupdate=datetime.datetime.utcnow)
     # child
     venue = db.relationship("Venue", back_populates="artists")
     # parent
     artist = db.relationship("Artist", back_populates="venues")
 
 
+# the venue bookings as an interval index (see availability.py), PostgreSQL
+# only: the other databases use ix_Show_venue_id_start_time
+SHOW_SLOT = "tsrange(start_time, start_time + duration * interval '1 minute')"
+event.listen(Show.__table__, 'after_create', DDL(
+    'CREATE EXTENSION IF NOT EXISTS btree_gist').execute_if(
+        dialect='postgresql'))
+event.listen(Show.__table__, 'after_create', DDL(
+    'CREATE INDEX "ix_Show_venue_slot" ON "Show" USING gist '
+    '(venue_id, %s)' % SHOW_SLOT).execute_if(dialect='postgresql'))
+
+
 class Artist(db.Model):  # Parent Table
     __tablename__ = 'Artist'
+    __table_args__ = (
+        # trigram indexes for the ILIKE '%term%' search (pg_trgm)
+        db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_Artist_city_trgm', 'city', postgresql_using='gin',
+                 postgresql_ops={'city': 'gin_trgm_ops'}),
+        # genre browse (genres @> ARRAY[genre])
+        db.Index('ix_Artist_genres', 'genres', postgresql_using='gin'),
+        # by name: ix_Artist_lower_name_id, below
+        # the few soft-deleted rows, see deletion.py
+        db.Index('ix_Artist_deleted_at', 'deleted_at',
+                 postgresql_where=db.text('deleted_at IS NOT NULL'),
+                 sqlite_where=db.text('deleted_at IS NOT NULL')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(300))
+    genres = db.Column(Genres)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
     website = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String())
+    # maintained by counters.py, as of CounterSweep.swept_at
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    # UTC, for conditional GETs (see conditional.py)
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.datetime.utcnow,
+                           onupdate=datetime.datetime.utcnow)
+    # soft delete: hidden from the site, shows kept (see deletion.py)
+    deleted_at = db.Column(db.DateTime)
 
-    venues = db.relationship("Show", back_populates="artist")
+    # the shows go with the artist (ON DELETE CASCADE)
+    venues = db.relationship("Show", back_populates="artist",
+                             passive_deletes=True)
 
 
 class Venue(db.Model):  # Child Table
     __tablename__ = 'Venue'
+    __table_args__ = (
+        # /venues groups and pages by area
+        db.Index('ix_Venue_state_city', 'state', 'city'),
+        # trigram indexes for the ILIKE '%term%' search (pg_trgm)
+        db.Index('ix_Venue_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_Venue_city_trgm', 'city', postgresql_using='gin',
+                 postgresql_ops={'city': 'gin_trgm_ops'}),
+        # genre browse (genres @> ARRAY[genre])
+        db.Index('ix_Venue_genres', 'genres', postgresql_using='gin'),
+        # by name: ix_Venue_lower_name_id, below
+        # the few soft-deleted rows, see deletion.py
+        db.Index('ix_Venue_deleted_at', 'deleted_at',
+                 postgresql_where=db.text('deleted_at IS NOT NULL'),
+                 sqlite_where=db.text('deleted_at IS NOT NULL')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -64,7 +140,7 @@ class Venue(db.Model):  # Child Table
     state = db.Column(db.String(120))
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(300))
+    genres = db.Column(Genres)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
@@ -72,6 +148,64 @@ class Venue(db.Model):  # Child Table
     seeking_talent = db.Column(
         db.Boolean, default=False, server_default="false")
     seeking_description = db.Column(db.String())
+    # maintained by counters.py, as of CounterSweep.swept_at
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    # UTC, for conditional GETs (see conditional.py)
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.datetime.utcnow,
+                           onupdate=datetime.datetime.utcnow)
+    # soft delete: hidden from the site, shows kept (see deletion.py)
+    deleted_at = db.Column(db.DateTime)
+
+    # parents, the shows go with the venue (ON DELETE CASCADE)
+    artists = db.relationship("Show", back_populates="venue",
+                              passive_deletes=True)
+
+
+# /artists and genre pages by name whatever its case (expressions, so
+# outside __table_args__), see alphabetical_query()
+db.Index('ix_Artist_lower_name_id', db.func.lower(Artist.name), Artist.id,
+         postgresql_where=db.text('deleted_at IS NULL'),
+         sqlite_where=db.text('deleted_at IS NULL'))
+db.Index('ix_Venue_lower_name_id', db.func.lower(Venue.name), Venue.id,
+         postgresql_where=db.text('deleted_at IS NULL'),
+         sqlite_where=db.text('deleted_at IS NULL'))
+
+# the gin_trgm_ops indexes of __table_args__ need pg_trgm, PostgreSQL only
+for table in (Artist.__table__, Venue.__table__):
+    event.listen(table, 'before_create', DDL(
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(
+            dialect='postgresql'))
+
+
+class CounterSweep(db.Model):
+    # single row: shows starting after swept_at are counted as upcoming
+    __tablename__ = 'CounterSweep'
+
+    id = db.Column(db.Integer, primary_key=True)
+    swept_at = db.Column(db.DateTime, nullable=False)
+
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+def live_shows():
+    # criterion on Show: neither its artist nor its venue is soft-deleted.
+    # NOT IN over the (few) deleted ids, read from the partial deleted_at
+    # indexes (never correlated with the Artist or Venue of the outer query)
+    return db.and_(
+        Show.artist_id.notin_(db.select([Artist.id]).where(
+            Artist.deleted_at.isnot(None)).correlate(None)),
+        Show.venue_id.notin_(db.select([Venue.id]).where(
+            Venue.deleted_at.isnot(None)).correlate(None)))
+
 
-    # parents
-    artists = db.relationship("Show", back_populates="venue")
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores foreign keys, ON DELETE CASCADE included, unless asked
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA foreign_keys = ON')
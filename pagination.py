@@ -0,0 +1,115 @@
+import base64
+import string
+from flask import request, abort, current_app, url_for
+from sqlalchemy import func, tuple_
+
+#----------------------------------------------------------------------------#
+# Keyset (cursor) pagination helpers.
+#----------------------------------------------------------------------------#
+# A cursor is the sort key of the last row of the previous page, so the next
+# page is fetched with "WHERE key > cursor ORDER BY key LIMIT n" and the cost
+# of a page does not depend on how deep into the listing it is (no OFFSET).
+
+
+def encode_cursor(*values):
+    raw = '|'.join(
+        v.isoformat() if hasattr(v, 'isoformat') else str(v) for v in values)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, *types):
+    # returns a tuple of values converted with the given types, or aborts 400
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        parts = raw.split('|', len(types) - 1)
+        if len(parts) != len(types):
+            raise ValueError(cursor)
+        return tuple(t(p) for t, p in zip(types, parts))
+    except (ValueError, TypeError, UnicodeError):
+        abort(400)
+
+
+def parse_datetime(value):
+    # ISO 8601, as a naive local time like the stored ones: a value with an
+    # offset (or Z) is converted to local time
+    import dateutil.parser  # not at import time, see app.py
+    value = dateutil.parser.isoparse(value)
+    if value.tzinfo is not None:
+        try:
+            value = value.astimezone().replace(tzinfo=None)
+        except OverflowError:
+            # e.g. 0001-01-01T00:00+01:00
+            raise ValueError(value)
+    return value
+
+
+def get_limit():
+    # ?limit= bounded by the PER_PAGE / MAX_PER_PAGE settings
+    limit = request.args.get(
+        'limit', current_app.config['PER_PAGE'], type=int)
+    return max(1, min(limit, current_app.config['MAX_PER_PAGE']))
+
+
+def get_datetime_arg(name):
+    # ?from= / ?to= style arguments, ISO 8601
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return parse_datetime(value)
+    except ValueError:
+        abort(400)
+
+
+#----------------------------------------------------------------------------#
+# Alphabetical listings.
+#----------------------------------------------------------------------------#
+# Listings of artists or venues by name page on (lower(name), id), so that
+# names sort and match the letter index whatever their case: ?cursor=
+# continues after the last row of the previous page and ?letter= (the letter
+# index) starts at the first name from that letter. Both are range scans of
+# the partial (lower(name), id) indexes of the listed rows.
+
+LETTERS = string.ascii_uppercase
+
+
+def alphabetical_query(query, name, id):
+    """
+    `query`, whose rows are (id, name, ...) tuples, narrowed to one page
+    (and the first row of the next) ordered by the `name` (ignoring case)
+    and `id` columns. Views check their validators on it before running it,
+    see alphabetical_page().
+    """
+    limit = get_limit()
+    cursor = request.args.get('cursor')
+    letter = request.args.get('letter')
+    key = func.lower(name)
+    if cursor:
+        after_id, after_name = decode_cursor(cursor, int, str)
+        # lowered by the database, as the names are. The first bound lets
+        # SQLite seek the index (it only scans for the row comparison)
+        after_key = func.lower(after_name)
+        query = query.filter(key >= after_key,
+                             tuple_(key, id) > tuple_(after_key, after_id))
+    elif letter:
+        if len(letter) != 1 or letter.upper() not in LETTERS:
+            abort(400)
+        query = query.filter(key >= letter.lower())
+    # one extra row tells whether there is a next page
+    return query.order_by(key, id).limit(limit + 1)
+
+
+def alphabetical_page(rows, endpoint, **values):
+    """
+    Returns (rows, next page url) for the rows of an alphabetical_query().
+    """
+    limit = get_limit()
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        args = request.args.to_dict()
+        args.pop('letter', None)
+        # the id first: names may contain the separator
+        args['cursor'] = encode_cursor(rows[-1][0], rows[-1][1])
+        next_url = url_for(endpoint, **dict(values, **args))
+    return rows, next_url
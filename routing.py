@@ -0,0 +1,152 @@
+import itertools
+import threading
+import time
+import sqlalchemy
+from flask import request, has_request_context
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm
+
+#----------------------------------------------------------------------------#
+# Read-replica routing.
+#----------------------------------------------------------------------------#
+# Statements issued while serving a GET (or HEAD) request go to one of the
+# SQLALCHEMY_REPLICA_URIS, everything else goes to the primary:
+#   - any request that is not a GET, and any session that has flushed
+#   - GETs from a client that wrote less than READ_YOUR_WRITES_SECONDS ago
+#     (e.g. the redirect after a form POST), recognised by a cookie set on
+#     the response of every write request
+#   - GETs while no replica is reachable (a replica that fails to hand out
+#     a connection is skipped for REPLICA_RETRY_SECONDS)
+#
+# A replica is picked once per session (i.e. per request), round-robin or
+# by least checked-out connections (REPLICA_SELECTION).
+
+PRIMARY_COOKIE = 'fyyur_primary'
+
+
+class Replica(object):
+
+    def __init__(self, uri, engine):
+        self.uri = uri
+        self.engine = engine
+        self.down_until = 0.0
+        self.checked_out = 0
+        self.lock = threading.Lock()
+        event.listen(engine, 'checkout', self.on_checkout)
+        event.listen(engine, 'checkin', self.on_checkin)
+
+    def on_checkout(self, *args):
+        with self.lock:
+            self.checked_out += 1
+
+    def on_checkin(self, *args):
+        with self.lock:
+            self.checked_out -= 1
+
+    def available(self):
+        return time.monotonic() >= self.down_until
+
+    def reachable(self, retry_seconds):
+        # hands a connection out of the pool and straight back
+        try:
+            self.engine.raw_connection().close()
+        except sqlalchemy.exc.DBAPIError:
+            self.down_until = time.monotonic() + retry_seconds
+            return False
+        return True
+
+
+class Replicas(object):
+    # the replica engines of one app
+
+    def __init__(self, app):
+        primary = app.config['SQLALCHEMY_DATABASE_URI']
+        uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+        self.selection = app.config.get('REPLICA_SELECTION', 'round-robin')
+        self.retry_seconds = app.config.get('REPLICA_RETRY_SECONDS', 30)
+        self.replicas = []
+        for uri in uris:
+            # same engine options as the primary when it is the same backend
+            options = {}
+            if uri.split(':', 1)[0] == primary.split(':', 1)[0]:
+                options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+            self.replicas.append(
+                Replica(uri, sqlalchemy.create_engine(uri, **options)))
+        self.counter = itertools.count()
+
+    def candidates(self):
+        replicas = [r for r in self.replicas if r.available()]
+        if self.selection == 'least-connections':
+            return sorted(replicas, key=lambda r: r.checked_out)
+        if not replicas:
+            return []
+        start = next(self.counter) % len(replicas)
+        return replicas[start:] + replicas[:start]
+
+    def pick(self):
+        # a reachable replica's engine, or None to use the primary
+        for replica in self.candidates():
+            if replica.reachable(self.retry_seconds):
+                return replica.engine
+        return None
+
+
+def reads_from_replica():
+    return (has_request_context()
+            and request.method in ('GET', 'HEAD')
+            and PRIMARY_COOKIE not in request.cookies)
+
+
+class RoutingSession(SignallingSession):
+
+    def __init__(self, db, **options):
+        self.db = db
+        self.replica = None
+        self.primary_only = not reads_from_replica()
+        SignallingSession.__init__(self, db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing:
+            # writes stick the rest of the session to the primary
+            self.primary_only = True
+        if not self.primary_only:
+            if self.replica is None:
+                self.replica = self.db.get_replicas(self.app).pick()
+                if self.replica is None:
+                    self.primary_only = True
+            if self.replica is not None:
+                return self.replica
+        return SignallingSession.get_bind(self, mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def __init__(self, *args, **kwargs):
+        self._replicas = {}
+        self._replicas_lock = threading.Lock()
+        SQLAlchemy.__init__(self, *args, **kwargs)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def get_replicas(self, app):
+        with self._replicas_lock:
+            if app not in self._replicas:
+                self._replicas[app] = Replicas(app)
+            return self._replicas[app]
+
+    def init_app(self, app):
+        registered = 'sqlalchemy' in app.extensions
+        SQLAlchemy.init_app(self, app)
+        if registered:
+            return
+
+        @app.after_request
+        def remember_write(response):
+            # read-your-writes: this client reads from the primary for a
+            # little while after any request that may have written
+            if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+                response.set_cookie(
+                    PRIMARY_COOKIE, '1', httponly=True,
+                    max_age=app.config.get('READ_YOUR_WRITES_SECONDS', 5))
+            return response
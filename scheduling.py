@@ -0,0 +1,129 @@
+from sqlalchemy import and_, exists
+from sqlalchemy.dialects import postgresql
+from models import db, Artist, Venue, Show
+from availability import DEFAULT_DURATION, EARLIEST, LATEST_SHOW, conflicts
+from agenda import day_tag
+import counters
+import fragments
+
+#----------------------------------------------------------------------------#
+# Scheduling shows.
+#----------------------------------------------------------------------------#
+# A show can repeat weekly or monthly from its start time until an end date
+# (included), e.g. a residency every Friday night. All the occurrences are
+# written at once: one query checks that the artist and the venue exist (and
+# are not soft-deleted), one multi-row INSERT adds the occurrences. Those the
+# artist already has a show at (Show's (artist_id, start_time) primary key)
+# and those that would double-book the venue (see availability.py) are
+# skipped and reported, the others are listed all the same.
+
+REPEATS = ('weekly', 'monthly')
+MAX_OCCURRENCES = 100
+
+
+class ScheduleError(ValueError):
+    pass
+
+
+def format_time(start_time):
+    return start_time.strftime('%Y-%m-%d %H:%M')
+
+
+def occurrences(start_time, repeat=None, until=None):
+    # the start times of a show repeating until the date `until`. Each one is
+    # counted from the first, so a show on the 31st stays on the last day of
+    # shorter months and is back on the 31st after them
+    if not EARLIEST <= start_time <= LATEST_SHOW:
+        raise ScheduleError('a show must start between %s and %s' % (
+            EARLIEST.date(), LATEST_SHOW.date()))
+    if not repeat:
+        return [start_time]
+    if repeat not in REPEATS:
+        raise ScheduleError('unknown repeat %r' % repeat)
+    if until is None or until < start_time.date():
+        raise ScheduleError('the repeat end date must not be before the show')
+    from dateutil.relativedelta import relativedelta  # see app.py
+    step = relativedelta(weeks=1) if repeat == 'weekly' else \
+        relativedelta(months=1)
+    times = []
+    while True:
+        try:
+            time = start_time + step * len(times)
+        except (OverflowError, ValueError):
+            # past year 9999, so past `until` as well
+            return times
+        if time.date() > until:
+            return times
+        if time > LATEST_SHOW:
+            raise ScheduleError('the show would repeat after %s' %
+                                LATEST_SHOW.date())
+        if len(times) == MAX_OCCURRENCES:
+            raise ScheduleError(
+                'a show repeats at most %d times' % MAX_OCCURRENCES)
+        times.append(time)
+
+
+def check_references(artist_id, venue_id):
+    # both foreign keys in a single query. The venue row stays locked until
+    # commit, so concurrent bookings of a venue are checked one at a time
+    # (FOR NO KEY UPDATE: inserting shows of the venue is not blocked)
+    row = db.session.query(Venue.id, exists().where(and_(
+        Artist.id == artist_id, Artist.deleted_at.is_(None)))).\
+        filter(Venue.id == venue_id, Venue.deleted_at.is_(None)).\
+        with_for_update(of=Venue, key_share=True).first()
+    if row is None:
+        raise ScheduleError('there is no venue %d' % venue_id)
+    if not row[1]:
+        raise ScheduleError('there is no artist %d' % artist_id)
+
+
+def insert_shows(artist_id, venue_id, start_times, duration):
+    # returns the start times inserted, in one statement
+    table = Show.__table__
+    rows = [{'artist_id': artist_id, 'venue_id': venue_id, 'start_time': t,
+             'duration': duration} for t in start_times]
+    if db.session.bind.dialect.name == 'postgresql':
+        statement = postgresql.insert(table).values(rows).\
+            on_conflict_do_nothing(index_elements=['artist_id', 'start_time']).\
+            returning(table.c.start_time)
+        return {t for t, in db.session.execute(statement)}
+    # no INSERT ... ON CONFLICT ... RETURNING (SQLite): the taken start times
+    # are read first
+    taken = {t for t, in db.session.query(Show.start_time).filter(
+        Show.artist_id == artist_id, Show.start_time.in_(start_times))}
+    rows = [row for row in rows if row['start_time'] not in taken]
+    if rows:
+        db.session.execute(table.insert().values(rows))
+    return {row['start_time'] for row in rows}
+
+
+def schedule(artist_id, venue_id, start_time, repeat=None, until=None,
+             duration=DEFAULT_DURATION):
+    """
+    Lists a show, or every occurrence of a repeating one, and commits.
+    Returns (start times listed, start times the artist already had a show
+    at, {start time: booked slots of the venue it overlaps}), raises
+    ScheduleError if nothing could be listed.
+    """
+    start_times = occurrences(start_time, repeat, until)
+    check_references(artist_id, venue_id)
+    clashes = conflicts(venue_id, [(t, duration) for t in start_times])
+    free = [t for t in start_times if t not in clashes]
+    inserted = insert_shows(artist_id, venue_id, free, duration) if free \
+        else set()
+    if not inserted:
+        db.session.rollback()
+        if clashes:
+            raise ScheduleError('the venue is booked at %s' % ', '.join(
+                format_time(t) for t in sorted(clashes)))
+        raise ScheduleError('the artist already has a show at %s' % ', '.join(
+            format_time(t) for t in start_times))
+    counters.add_shows([
+        {'artist_id': artist_id, 'venue_id': venue_id, 'start_time': t}
+        for t in inserted])
+    # the cached calendar days (see agenda.py)
+    fragments.changed(*{day_tag(t.date()) for t in inserted})
+    db.session.commit()
+    return (sorted(inserted),
+            [t for t in free if t not in inserted],
+            clashes)
@@ -0,0 +1,58 @@
+from sqlalchemy import func, case, and_, or_, type_coerce
+from models import db
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+# Venue and Artist names and cities carry pg_trgm GIN indexes, which serve
+# the case-insensitive ILIKE '%term%' filter below without a sequential scan.
+# Results are ranked by trigram similarity of the name to the search term.
+
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def rank(column, term):
+    if db.session.bind.dialect.name == 'postgresql':
+        return func.similarity(column, term)
+    # no pg_trgm (e.g. SQLite): exact match, then prefix match, then the rest
+    lowered = func.lower(column)
+    return case([
+        (lowered == term.lower(), 2),
+        (lowered.like(escape_like(term.lower()) + '%', escape='\\'), 1)
+    ], else_=0)
+
+
+def has_genre(column, genre):
+    if db.session.bind.dialect.name == 'postgresql':
+        # genres @> ARRAY[genre], served by the GIN index on genres
+        return column.contains([genre])
+    # JSON list on SQLite
+    return type_coerce(column, db.String).like(
+        '%"' + escape_like(genre) + '"%', escape='\\')
+
+
+def search(model, term, page, per_page):
+    """
+    Returns (count, rows) for one page of the `model` rows whose name or city
+    contains `term` (soft-deleted ones aside), best matches first.
+    Each row is (id, name, num_upcoming_shows), the count of upcoming shows
+    being the model's counter column (see counters.py).
+    """
+    pattern = '%' + escape_like(term) + '%'
+    matches = and_(or_(
+        model.name.ilike(pattern, escape='\\'),
+        model.city.ilike(pattern, escape='\\')
+    ), model.deleted_at.is_(None))
+    count = db.session.query(func.count(model.id)).filter(matches).scalar()
+
+    rows = db.session.query(
+        model.id,
+        model.name,
+        model.upcoming_shows_count.label('num_upcoming_shows')
+    ).filter(matches).\
+        order_by(rank(model.name, term).desc(), model.name, model.id).\
+        limit(per_page).offset((page - 1) * per_page).all()
+
+    return count, rows
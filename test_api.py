@@ -0,0 +1,133 @@
+import base64
+import datetime
+import json
+import unittest
+from unittest import mock
+
+import api
+from test_base import AppTestCase
+
+
+class ReadApiTestCase(AppTestCase):
+    config = {'ADMIN_API_TOKEN': 'secret'}
+
+    def setUp(self):
+        super().setUp()
+        self.artist_ids = [self.add_artist('Artist %d' % i) for i in range(5)]
+        self.venue_id = self.add_venue()
+        # two shows at the same time: the cursor carries the artist too
+        for i, day in enumerate((3, 3, 4)):
+            self.add_show(self.artist_ids[i], self.venue_id,
+                          datetime.datetime(2031, 1, day, 20, 0))
+
+    def walk(self, url):
+        # every row of a listing, page after page
+        rows = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            body = response.get_json()
+            rows += body['data']
+            url = body['next']
+            pages += 1
+        return rows, pages
+
+    def test_cursor_round_trip(self):
+        rows, pages = self.walk('/api/v1/artists?limit=2&fields=id')
+        self.assertEqual([row['id'] for row in rows], self.artist_ids)
+        self.assertEqual(pages, 3)
+
+        rows, pages = self.walk('/api/v1/shows?limit=1'
+                                '&fields=artist_id,start_time')
+        self.assertEqual(rows, [
+            {'artist_id': self.artist_ids[0],
+             'start_time': '2031-01-03T20:00:00'},
+            {'artist_id': self.artist_ids[1],
+             'start_time': '2031-01-03T20:00:00'},
+            {'artist_id': self.artist_ids[2],
+             'start_time': '2031-01-04T20:00:00'}])
+        # the last page has no next link
+        self.assertEqual(pages, 3)
+
+    def test_cursor_keeps_the_filters(self):
+        response = self.client.get('/api/v1/shows?limit=1&fields=artist_id'
+                                   '&from=2031-01-03T21:00')
+        body = response.get_json()
+        self.assertEqual(body['data'], [{'artist_id': self.artist_ids[2]}])
+        self.assertIsNone(body['next'])
+
+    def test_bad_cursor(self):
+        def cursor(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode()
+
+        for url in ('/api/v1/artists?cursor=%%%',
+                    '/api/v1/artists?cursor=' + cursor('one'),
+                    '/api/v1/shows?cursor=' + cursor('2031-01-03T20:00:00'),
+                    '/api/v1/shows?cursor=' + cursor('tonight|1')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.get_json()['error'], 400)
+
+    def test_sparse_fields(self):
+        response = self.client.get('/api/v1/artists/%d?fields=name,city'
+                                   % self.artist_ids[0])
+        self.assertEqual(response.get_json()['data'],
+                         {'name': 'Artist 0', 'city': 'San Francisco'})
+        # the sort key isn't returned unless asked for
+        data = self.client.get('/api/v1/venues?fields=name').get_json()['data']
+        self.assertEqual(data, [{'name': 'Venue'}])
+        # the artist and venue columns of shows come from a join
+        data = self.client.get('/api/v1/shows?fields=artist_name,venue_name'
+                               '&limit=1').get_json()['data']
+        self.assertEqual(data, [{'artist_name': 'Artist 0',
+                                 'venue_name': 'Venue'}])
+        for fields in ('password', ',', 'name,password'):
+            with self.subTest(fields=fields):
+                self.assertEqual(self.client.get(
+                    '/api/v1/artists?fields=' + fields).status_code, 400)
+
+    def test_not_found(self):
+        for url in ('/api/v1/artists/0', '/api/v1/venues/0',
+                    '/api/v1/shows/%d/2031-01-05T20:00' % self.artist_ids[0]):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.get_json()['error'], 404)
+
+    def export(self, token='secret', query=''):
+        headers = {'Authorization': 'Bearer ' + token} if token else {}
+        return self.client.get('/api/v1/export/shows.ndjson' + query,
+                               headers=headers, buffered=False)
+
+    def test_export(self):
+        # in batches smaller than the table
+        with mock.patch('api.EXPORT_BATCH', 2):
+            response = self.export(query='?fields=artist_id,venue_name')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            self.assertTrue(response.is_streamed)
+            lines = list(response.response)
+            response.close()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {'artist_id': artist_id, 'venue_name': 'Venue'}
+            for artist_id in self.artist_ids[:3]])
+
+    def test_export_needs_the_token(self):
+        for token in (None, 'wrong'):
+            with self.subTest(token=token):
+                response = self.export(token)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response.headers['WWW-Authenticate'],
+                                 'Bearer')
+        self.app.config['ADMIN_API_TOKEN'] = ''
+        try:
+            self.assertEqual(self.export().status_code, 404)
+            self.assertEqual(self.export('').status_code, 404)
+        finally:
+            self.app.config['ADMIN_API_TOKEN'] = 'secret'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+import assets
+from test_base import AppTestCase
+
+
+class AssetsTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # a copy of the bundled sources, the build writes next to them
+        self.static_folder = self.app.static_folder
+        self.manifest = self.app.extensions['assets']
+        self.app.static_folder = tempfile.mkdtemp()
+        for sources in assets.BUNDLES.values():
+            for source in sources:
+                path = os.path.join(self.app.static_folder, source)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                shutil.copy(os.path.join(self.static_folder, source), path)
+
+    def tearDown(self):
+        shutil.rmtree(self.app.static_folder)
+        self.app.static_folder = self.static_folder
+        self.app.extensions['assets'] = self.manifest
+        super().tearDown()
+
+    def build(self):
+        manifest = assets.build(self.app)
+        self.app.extensions['assets'] = manifest
+        return manifest
+
+    def dist(self, name):
+        with open(os.path.join(self.app.static_folder, assets.DIST, name),
+                  'rb') as f:
+            return f.read()
+
+    def test_build(self):
+        manifest = self.build()
+        self.assertEqual(sorted(manifest), sorted(assets.BUNDLES))
+        self.assertEqual(assets.load_manifest(self.app), manifest)
+        for hashed in manifest.values():
+            self.assertRegex(hashed, assets.BUILT)
+            self.assertEqual(gzip.decompress(self.dist(hashed + '.gz')),
+                             self.dist(hashed))
+        # the names follow the content only
+        self.assertEqual(self.build(), manifest)
+
+    def test_compressed_variant(self):
+        hashed = self.build()['main.css']
+        url = '/assets/' + hashed
+        # the responses close the files they were sent from
+        with self.client.get(
+                url, headers={'Accept-Encoding': 'gzip'}) as response:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertEqual(response.get_data(), self.dist(hashed + '.gz'))
+            self.assertEqual(response.mimetype, 'text/css')
+            self.assertEqual(response.headers['Cache-Control'],
+                             assets.IMMUTABLE)
+            self.assertIn('Accept-Encoding', response.vary)
+
+        with self.client.get(
+                url, headers={'Accept-Encoding': 'deflate'}) as response:
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertEqual(response.get_data(), self.dist(hashed))
+
+    @unittest.skipIf(assets.brotli is None, 'Brotli is not installed')
+    def test_brotli_preferred(self):
+        hashed = self.build()['main.js']
+        with self.client.get('/assets/' + hashed, headers={
+                'Accept-Encoding': 'gzip, br'}) as response:
+            self.assertEqual(response.headers['Content-Encoding'], 'br')
+            self.assertEqual(response.get_data(), self.dist(hashed + '.br'))
+
+    def test_not_found(self):
+        self.build()
+        for name in ('manifest.json', 'main.0123456789.css',
+                     self.app.extensions['assets']['main.css'] + '.gz'):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.client.get('/assets/' + name).status_code, 404)
+
+    def test_pages_link_the_bundles(self):
+        self.app.extensions['assets'] = {}
+        page = self.client.get('/').get_data(as_text=True)
+        self.assertIn('/static/css/main.css', page)
+        manifest = self.build()
+        page = self.client.get('/').get_data(as_text=True)
+        for hashed in manifest.values():
+            self.assertIn('/assets/' + hashed, page)
+        self.assertNotIn('/static/css/main.css', page)
+
+    def test_minify_css(self):
+        # the space before a colon may be a descendant selector, it stays
+        self.assertEqual(
+            assets.minify_css('/* x */ a :hover ,b { color: red ; }'),
+            'a :hover,b{color:red}')
+        self.assertEqual(
+            assets.absolute_urls("a{background:url('../img/x.png')}",
+                                 'css/main.css', '/static'),
+            "a{background:url('/static/img/x.png')}")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import datetime
+import unittest
+
+from test_base import AppTestCase, local
+
+
+class AvailabilityTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.artist_id = self.add_artist()
+        self.venue_id = self.add_venue()
+        self.add_show(self.artist_id, self.venue_id,
+                      datetime.datetime(2031, 1, 3, 20, 0))
+
+    def availability(self, query):
+        return self.client.get('/venues/%d/availability?%s' % (
+            self.venue_id, query))
+
+    def test_booked_and_free_slots(self):
+        data = self.availability(
+            'from=2031-01-03T00:00&to=2031-01-04').get_json()['data']
+        self.assertEqual(data['booked'], [{
+            'start_time': '2031-01-03T20:00:00',
+            'end_time': '2031-01-03T22:00:00',
+            'artist_ids': [self.artist_id],
+        }])
+        self.assertEqual(data['free'], [
+            {'start_time': '2031-01-03T00:00:00',
+             'end_time': '2031-01-03T20:00:00'},
+            {'start_time': '2031-01-03T22:00:00',
+             'end_time': '2031-01-04T00:00:00'},
+        ])
+
+    def test_conflicts_of_a_proposed_show(self):
+        data = self.availability(
+            'from=2031-01-03T00:00&to=2031-01-04'
+            '&start_time=2031-01-03T21:30&duration=60').get_json()['data']
+        self.assertEqual([slot['start_time'] for slot in data['conflicts']],
+                         ['2031-01-03T20:00:00'])
+
+    def test_aware_times_are_local_times(self):
+        # an offset (or Z) is converted to the naive local times stored
+        start = datetime.datetime(2031, 1, 3, 18, 0,
+                                  tzinfo=datetime.timezone.utc)
+        response = self.availability('from=2031-01-03T18:00:00Z'
+                                     '&to=2031-01-04T18:00:00%2B00:00')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()['data']
+        self.assertEqual(data['from'], local(start).isoformat())
+        self.assertEqual(
+            data['to'],
+            local(start + datetime.timedelta(days=1)).isoformat())
+
+    def test_bad_window(self):
+        self.assertEqual(self.availability(
+            'from=2031-01-04&to=2031-01-03').status_code, 400)
+        self.assertEqual(self.availability('from=tomorrow').status_code, 400)
+        self.assertEqual(self.availability(
+            'from=0001-01-01T00:00%2B14:00').status_code, 400)
+
+    def test_ends_of_the_datetime_range(self):
+        for query in ('from=9999-12-20',
+                      'from=9999-12-31T23:00&to=9999-12-31T23:30'
+                      '&start_time=9999-12-31T23:00',
+                      'start_time=0001-01-01T00:00',
+                      'from=0001-01-01T00:00&to=0001-01-02'):
+            with self.subTest(query=query):
+                self.assertEqual(self.availability(query).status_code, 400)
+        # the last window and show that fit
+        data = self.availability(
+            'from=9998-12-30&to=9999-12-31&start_time=9999-12-30T22:00'
+            '&duration=60').get_json()['data']
+        self.assertEqual(data['conflicts'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Shared setup of the tests: the app of the test profile on a scratch
+database, recreated for every test.
+
+    python -m unittest discover -p 'test_*.py' -v
+
+TEST_DATABASE_URL picks the database (a SQLite file in the temp directory
+by default). It is dropped and recreated, never point it at real data.
+"""
+import os
+import tempfile
+import unittest
+
+# the app reads its database from the environment when config is imported
+os.environ['DATABASE_URL'] = os.environ.get(
+    'TEST_DATABASE_URL',
+    'sqlite:///' + os.path.join(tempfile.gettempdir(), 'fyyur_test.db'))
+
+from app import create_app  # noqa: E402
+from config import TestConfig  # noqa: E402
+from models import db, Artist, Venue, Show  # noqa: E402
+
+
+class AppTestCase(unittest.TestCase):
+    # settings on top of TestConfig, for a whole test case
+    config = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(type('Config', (TestConfig,), dict(
+            {'JINJA_BYTECODE_CACHE': False}, **cls.config)))
+
+    def setUp(self):
+        self.context = self.app.app_context()
+        self.context.push()
+        db.drop_all()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def add_artist(self, name='Artist', **values):
+        artist = Artist(name=name, city='San Francisco', state='CA',
+                        phone='555-555-5555', genres=['Jazz'], **values)
+        db.session.add(artist)
+        db.session.commit()
+        return artist.id
+
+    def add_venue(self, name='Venue', **values):
+        venue = Venue(name=name, city='San Francisco', state='CA',
+                      address='1 Main St', phone='555-555-5555',
+                      genres=['Jazz'], **values)
+        db.session.add(venue)
+        db.session.commit()
+        return venue.id
+
+    def add_show(self, artist_id, venue_id, start_time, duration=120):
+        db.session.add(Show(artist_id=artist_id, venue_id=venue_id,
+                            start_time=start_time, duration=duration))
+        db.session.commit()
+
+    def flashes(self):
+        with self.client.session_transaction() as session:
+            return [message for _, message in session.pop('_flashes', [])]
+
+
+def local(value):
+    # an aware datetime as the naive local time the app stores
+    return value.astimezone().replace(tzinfo=None)
+
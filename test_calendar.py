@@ -0,0 +1,111 @@
+import datetime
+import re
+import unittest
+
+from fragments import fragment_cache
+from test_base import AppTestCase
+
+SERVER_TIMING = re.compile(r'desc="(\d+) queries"')
+
+
+class CalendarTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        fragment_cache.clear()
+        self.artist_id = self.add_artist('Calendar Artist')
+        self.venue_id = self.add_venue()
+        self.add_show(self.artist_id, self.venue_id,
+                      datetime.datetime(2031, 1, 4, 20, 0))
+
+    def get(self, url):
+        # (response, SQL statements it took)
+        response = self.client.get(url)
+        queries = SERVER_TIMING.search(response.headers['Server-Timing'])
+        return response, int(queries.group(1))
+
+    def test_page(self):
+        response = self.client.get('/shows/calendar?from=2031-01-03'
+                                   '&to=2031-01-09&city=san+francisco')
+        self.assertEqual(response.status_code, 200)
+        page = response.get_data(as_text=True)
+        self.assertIn('Calendar Artist', page)
+        self.assertIn('Saturday January 4', page)
+        self.assertIn('from=2030-12-27&amp;to=2031-01-02', page)
+        self.assertIn('from=2031-01-10&amp;to=2031-01-16', page)
+        page = self.client.get('/shows/calendar?from=2031-01-03'
+                               '&to=2031-01-09&city=Oakland').get_data(
+            as_text=True)
+        self.assertNotIn('Calendar Artist', page)
+
+    def test_json(self):
+        response = self.client.get('/api/v1/shows/calendar?from=2031-01-03'
+                                   '&to=2031-01-05')
+        self.assertEqual(response.status_code, 200)
+        days = response.get_json()['data']
+        self.assertEqual([day['date'] for day in days],
+                         ['2031-01-03', '2031-01-04', '2031-01-05'])
+        self.assertEqual([len(day['shows']) for day in days], [0, 1, 0])
+        self.assertEqual(days[1]['shows'][0]['artist_id'], self.artist_id)
+
+    def test_bad_window(self):
+        for query in ('from=tomorrow', 'from=2031-01-09&to=2031-01-03',
+                      'from=2031-01-01&to=2031-03-01', 'from=9999-12-31'):
+            for url in ('/shows/calendar', '/api/v1/shows/calendar'):
+                with self.subTest(url=url, query=query):
+                    self.assertEqual(
+                        self.client.get(url + '?' + query).status_code, 400)
+
+    def test_ends_of_the_date_range(self):
+        # what is left of the week, no link past the first or last day
+        for query, earlier, later in (
+                ('from=9999-12-30', True, False),
+                ('from=9999-12-24&to=9999-12-30', True, False),
+                ('from=0001-01-01', False, True)):
+            with self.subTest(query=query):
+                response = self.client.get('/shows/calendar?' + query)
+                self.assertEqual(response.status_code, 200)
+                page = response.get_data(as_text=True)
+                self.assertEqual('Earlier' in page, earlier)
+                self.assertEqual('Later' in page, later)
+                response = self.client.get('/api/v1/shows/calendar?' + query)
+                self.assertEqual(response.status_code, 200)
+        days = self.client.get('/api/v1/shows/calendar?from=9999-12-30').\
+            get_json()['data']
+        self.assertEqual([day['date'] for day in days], ['9999-12-30'])
+
+    def test_cached_days(self):
+        url = '/api/v1/shows/calendar?from=2031-01-03&to=2031-01-09'
+        response, queries = self.get(url)
+        self.assertEqual(queries, 1)
+        response, queries = self.get(url)
+        self.assertEqual(queries, 0)
+        # the twins share the buckets
+        response, queries = self.get(url.replace('/api/v1', ''))
+        self.assertEqual(queries, 0)
+
+        # listing a show invalidates its day, the other days stay cached
+        self.client.post('/shows/create', data={
+            'artist_id': self.artist_id, 'venue_id': self.venue_id,
+            'start_time': '2031-01-06 20:00'})
+        response, queries = self.get(url)
+        self.assertEqual(queries, 1)
+        days = response.get_json()['data']
+        self.assertEqual([len(day['shows']) for day in days],
+                         [0, 1, 0, 1, 0, 0, 0])
+        response, queries = self.get(url)
+        self.assertEqual(queries, 0)
+
+    def test_cached_days_per_filter(self):
+        url = '/api/v1/shows/calendar?from=2031-01-03&to=2031-01-09'
+        self.get(url)
+        response, queries = self.get(url + '&genre=Jazz')
+        self.assertEqual(queries, 1)
+        response, queries = self.get(url + '&genre=Rock+n+Roll')
+        self.assertEqual(queries, 1)
+        self.assertEqual(sum(len(day['shows'])
+                             for day in response.get_json()['data']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
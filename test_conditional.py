@@ -0,0 +1,85 @@
+import datetime
+import re
+import unittest
+
+import deletion
+from models import db, Artist, Venue
+from test_base import AppTestCase
+
+SERVER_TIMING = re.compile(r'desc="(\d+) queries"')
+
+
+class ValidatorsTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.artist_ids = [self.add_artist('Artist %d' % i) for i in range(3)]
+        self.venue_id = self.add_venue()
+        self.add_show(self.artist_ids[0], self.venue_id,
+                      datetime.datetime(2031, 1, 3, 20, 0))
+
+    def revalidate(self, url, change):
+        # (status, queries) of a request for `url` with the ETag it had
+        # before `change` was called
+        etag = self.client.get(url).headers['ETag']
+        change()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        queries = SERVER_TIMING.search(response.headers['Server-Timing'])
+        return response.status_code, int(queries.group(1))
+
+    def rename(self, model, id):
+        def change():
+            model.query.get(id).name = 'Renamed'
+            db.session.commit()
+        return change
+
+
+class ListValidatorsTestCase(ValidatorsTestCase):
+
+    def test_unchanged(self):
+        for url in ('/artists', '/artists?limit=2', '/venues', '/shows',
+                    '/genres/Jazz/artists'):
+            with self.subTest(url=url):
+                # the aggregate only, not the page
+                self.assertEqual(self.revalidate(url, lambda: None), (304, 1))
+
+    def test_row_changed(self):
+        self.assertEqual(self.revalidate(
+            '/artists', self.rename(Artist, self.artist_ids[1]))[0], 200)
+        self.assertEqual(self.revalidate(
+            '/shows', self.rename(Venue, self.venue_id))[0], 200)
+
+    def test_rows_listed_changed(self):
+        # a hard delete leaves no newer updated_at behind
+        self.assertEqual(self.revalidate(
+            '/artists?limit=2',
+            lambda: deletion.delete(Artist, [self.artist_ids[1]]))[0], 200)
+        self.assertEqual(self.revalidate(
+            '/artists', lambda: self.add_artist('Artist 3'))[0], 200)
+
+
+class DetailValidatorsTestCase(ValidatorsTestCase):
+
+    def test_unchanged(self):
+        url = '/artists/%d' % self.artist_ids[0]
+        self.assertEqual(self.revalidate(url, lambda: None), (304, 1))
+
+    def test_etag_only(self):
+        # rows leaving the page don't make it newer: no Last-Modified
+        response = self.client.get('/venues/%d' % self.venue_id)
+        self.assertIn('ETag', response.headers)
+        self.assertNotIn('Last-Modified', response.headers)
+        response = self.client.get('/venues/%d' % self.venue_id, headers={
+            'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_shows_left(self):
+        # the venue's show goes with it (ON DELETE CASCADE), the artist's
+        # page loses it without any newer updated_at
+        self.assertEqual(self.revalidate(
+            '/artists/%d' % self.artist_ids[0],
+            lambda: deletion.delete(Venue, [self.venue_id]))[0], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import datetime
+import unittest
+
+import counters
+from models import db, Show
+from test_base import AppTestCase
+
+
+class CountersTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        artist_ids = [self.add_artist('Artist %d' % i) for i in range(2)]
+        venue_id = self.add_venue()
+        for i, artist_id in enumerate(artist_ids):
+            self.add_show(artist_id, venue_id,
+                          datetime.datetime(2031, 1, 3 + i, 20, 0))
+        counters.rebuild(datetime.datetime(2031, 1, 1))
+
+    def test_sweep(self):
+        self.assertEqual(counters.sweep(datetime.datetime(2031, 1, 4)), 1)
+        self.assertEqual(counters.sweep(datetime.datetime(2031, 1, 4)), 0)
+        self.assertEqual(list(counters.check()), [])
+
+    def test_shows_where(self):
+        criterion = Show.start_time < datetime.datetime(2031, 1, 4)
+        self.assertEqual(counters.remove_shows_where(criterion), 1)
+        Show.query.filter(criterion).delete(synchronize_session=False)
+        db.session.commit()
+        self.assertEqual(list(counters.check()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
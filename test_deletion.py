@@ -0,0 +1,75 @@
+import datetime
+import json
+import unittest
+from unittest import mock
+
+from sqlalchemy.exc import OperationalError
+
+import api
+import counters
+from models import db, Artist, Venue, Show
+from test_base import AppTestCase
+
+
+class BulkDeleteTestCase(AppTestCase):
+    config = {'ADMIN_API_TOKEN': 'secret'}
+
+    def setUp(self):
+        super().setUp()
+        self.artist_id = self.add_artist()
+        self.venue_id = self.add_venue()
+        self.add_show(self.artist_id, self.venue_id,
+                      datetime.datetime(2031, 1, 3, 20, 0))
+        counters.rebuild()
+
+    def delete(self, body, token='secret'):
+        headers = {'Authorization': 'Bearer ' + token} if token else {}
+        return self.client.post('/api/v1/venues/delete',
+                                data=json.dumps(body), headers=headers,
+                                content_type='application/json')
+
+    def test_delete(self):
+        response = self.delete({'ids': [self.venue_id]})
+        self.assertEqual(response.get_json()['data'],
+                         {'deleted': 1, 'shows': 1, 'soft': False})
+        self.assertEqual(Venue.query.count(), 0)
+        self.assertEqual(Show.query.count(), 0)
+        db.session.expire_all()
+        self.assertEqual(
+            Artist.query.get(self.artist_id).upcoming_shows_count, 0)
+
+    def test_token_required(self):
+        for token in (None, 'wrong', 'secret '):
+            with self.subTest(token=token):
+                response = self.delete({'ids': [self.venue_id]}, token)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response.get_json()['error'], 401)
+        self.assertEqual(Venue.query.count(), 1)
+
+    def test_off_without_a_token(self):
+        self.app.config['ADMIN_API_TOKEN'] = ''
+        try:
+            response = self.delete({'ids': [self.venue_id]}, '')
+        finally:
+            self.app.config['ADMIN_API_TOKEN'] = 'secret'
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Venue.query.count(), 1)
+
+    def test_bad_request(self):
+        for body in ({'ids': []}, {'ids': ['1']}, {'ids': [1], 'soft': 1},
+                     {'ids': list(range(1, api.DELETE_MAX_IDS + 2))}):
+            with self.subTest(body=body):
+                self.assertEqual(self.delete(body).status_code, 400)
+
+    def test_database_error(self):
+        error = OperationalError('DELETE', {}, Exception('gone'))
+        with mock.patch('deletion.delete', side_effect=error), \
+                mock.patch.object(self.app.logger, 'exception'):
+            response = self.delete({'ids': [self.venue_id]})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.get_json()['error'], 500)
+        self.assertEqual(Venue.query.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import datetime
+import re
+import unittest
+
+import deletion
+from models import Venue
+from test_base import AppTestCase
+
+SERVER_TIMING = re.compile(r'desc="(\d+) queries"')
+
+
+class DetailPageTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.venue_id = self.add_venue()
+        self.artist_ids = [self.add_artist('Artist %d' % i) for i in range(6)]
+
+    def get(self, url, **headers):
+        # (response, SQL statements it took)
+        response = self.client.get(url, headers=headers)
+        queries = SERVER_TIMING.search(response.headers['Server-Timing'])
+        return response, int(queries.group(1))
+
+    def add_shows(self, count, first=0):
+        # past and upcoming shows of the venue, by different artists
+        for i in range(first, count):
+            self.add_show(self.artist_ids[i], self.venue_id,
+                          datetime.datetime(2001 if i % 2 else 2031, 1, 1 + i))
+
+    def test_queries_per_page(self):
+        # the same with one show as with several
+        for first, shows in ((0, 1), (1, 5)):
+            self.add_shows(shows, first)
+            for url in ('/venues/%d' % self.venue_id,
+                        '/artists/%d' % self.artist_ids[0]):
+                with self.subTest(shows=shows, url=url):
+                    response, queries = self.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    # a 304 runs the validators only: one statement
+                    not_modified, validators = self.get(
+                        url, **{'If-None-Match': response.headers['ETag']})
+                    self.assertEqual(not_modified.status_code, 304)
+                    self.assertEqual(validators, 1)
+                    # and the page itself exactly one more
+                    self.assertEqual(queries - validators, 1)
+
+    def test_past_and_upcoming(self):
+        self.add_shows(5)
+        page = self.client.get('/venues/%d' % self.venue_id).get_data(
+            as_text=True)
+        for i in range(5):
+            self.assertIn('Artist %d' % i, page)
+        self.assertRegex(page, r'3 Upcoming\s+Shows')
+        self.assertRegex(page, r'2 Past\s+Shows')
+
+    def test_without_shows(self):
+        response = self.client.get('/venues/%d' % self.venue_id)
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleted(self):
+        deletion.delete(Venue, [self.venue_id], soft=True)
+        response = self.client.get('/venues/%d' % self.venue_id)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get('/venues/0').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
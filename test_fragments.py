@@ -0,0 +1,164 @@
+import unittest
+from unittest import mock
+
+from flask import render_template_string
+
+import fragments
+from fragments import MemoryBackend, fragment_cache
+from models import db, Artist
+from test_base import AppTestCase
+
+
+class MemoryBackendTestCase(unittest.TestCase):
+
+    def test_least_recently_used_first(self):
+        backend = MemoryBackend(max_bytes=3)
+        for key in 'abc':
+            backend.set(key, key, 60, ())
+        self.assertEqual(backend.get('a'), 'a')
+        backend.set('d', 'd', 60, ())
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual([backend.get(key) for key in 'acd'], ['a', 'c', 'd'])
+
+    def test_byte_bound(self):
+        backend = MemoryBackend(max_bytes=10)
+        backend.set('a', 'x' * 4, 60, ('A',))
+        backend.set('b', 'é' * 3, 60, ('A',))  # 6 bytes in UTF-8
+        self.assertEqual(backend.bytes, 10)
+        backend.set('c', 'x', 60, ())
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(backend.bytes, 7)
+        self.assertEqual(backend.tags, {'A': {'b'}})
+        # bigger than the whole cache: not kept, nothing evicted for it
+        backend.set('d', 'x' * 11, 60, ())
+        self.assertIsNone(backend.get('d'))
+        self.assertEqual(backend.get('b'), 'é' * 3)
+        # replacing an entry counts its new size only
+        backend.set('c', 'xx', 60, ())
+        self.assertEqual(backend.bytes, 8)
+
+    def test_ttl(self):
+        backend = MemoryBackend(max_bytes=100)
+        with mock.patch('fragments.time.monotonic', return_value=1000.0):
+            backend.set('a', 'a', 60, ('A',))
+        with mock.patch('fragments.time.monotonic', return_value=1060.0):
+            self.assertEqual(backend.get('a'), 'a')
+        with mock.patch('fragments.time.monotonic', return_value=1060.5):
+            self.assertIsNone(backend.get('a'))
+        self.assertEqual((backend.bytes, backend.tags), (0, {}))
+
+    def test_invalidate(self):
+        backend = MemoryBackend(max_bytes=100)
+        backend.set('a', 'a', 60, ('A', 'Both'))
+        backend.set('b', 'b', 60, ('B', 'Both'))
+        backend.invalidate(('A',))
+        self.assertEqual([backend.get('a'), backend.get('b')], [None, 'b'])
+        backend.invalidate(('Both',))
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual((backend.bytes, backend.tags), (0, {}))
+
+
+class FragmentCacheTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        fragment_cache.clear()
+        self.artist_id = self.add_artist('Cached')
+        self.renders = 0
+
+    def render(self):
+        self.renders += 1
+        return 'rendered %d' % self.renders
+
+    def cached(self):
+        return fragment_cache.cached(
+            ('artist', self.artist_id), self.render,
+            tags=[fragments.tag(Artist, self.artist_id)])
+
+    def test_cached(self):
+        self.assertEqual(self.cached(), 'rendered 1')
+        self.assertEqual(self.cached(), 'rendered 1')
+
+    def test_invalidated_after_commit(self):
+        self.cached()
+        artist = Artist.query.get(self.artist_id)
+        artist.name = 'Renamed'
+        db.session.flush()
+        # not before the write is committed
+        self.assertEqual(self.cached(), 'rendered 1')
+        db.session.commit()
+        self.assertEqual(self.cached(), 'rendered 2')
+
+    def test_bulk_update_invalidates_the_model(self):
+        fragment_cache.set(('artists',), 'all of them', tags=['Artist'])
+        self.cached()
+        Artist.query.filter(Artist.id == self.artist_id).update(
+            {'name': 'Renamed'}, synchronize_session=False)
+        db.session.commit()
+        self.assertIsNone(fragment_cache.get(('artists',)))
+        # which rows changed isn't known, their tags are kept
+        self.assertEqual(self.cached(), 'rendered 1')
+
+    def test_kept_on_rollback(self):
+        self.cached()
+        artist = Artist.query.get(self.artist_id)
+        artist.name = 'Renamed'
+        db.session.flush()
+        db.session.rollback()
+        # the next commit doesn't carry the rolled back tags
+        self.add_artist('Other')
+        self.assertEqual(self.cached(), 'rendered 1')
+
+    def test_changed(self):
+        self.cached()
+        fragments.changed(fragments.tag(Artist, self.artist_id))
+        self.assertEqual(self.cached(), 'rendered 1')
+        db.session.commit()
+        self.assertEqual(self.cached(), 'rendered 2')
+
+    def test_cache_tag(self):
+        template = ("{% cache 'name', artist.id, "
+                    "tags=['Artist:%s' % artist.id], ttl=60 %}"
+                    "<b>{{ artist.name }}</b>{% endcache %}")
+        with self.app.test_request_context():
+            artist = Artist.query.get(self.artist_id)
+            self.assertEqual(render_template_string(template, artist=artist),
+                             '<b>Cached</b>')
+            # the body isn't rendered again
+            artist.name = 'Renamed'
+            self.assertEqual(render_template_string(template, artist=artist),
+                             '<b>Cached</b>')
+            db.session.commit()
+            self.assertEqual(render_template_string(template, artist=artist),
+                             '<b>Renamed</b>')
+
+
+class WithoutBackendTestCase(AppTestCase):
+    config = {'FRAGMENT_CACHE_URL': '', 'FRAGMENT_CACHE_LOCAL_TTL': 10}
+
+    def setUp(self):
+        super().setUp()
+        fragment_cache.clear()
+
+    def test_only_local_entries(self):
+        self.assertIsNone(fragment_cache.backend)
+        self.assertEqual(fragment_cache.cached('key', lambda: 'a'), 'a')
+        self.assertEqual(fragment_cache.cached('key', lambda: 'b'), 'b')
+        fragment_cache.set(('shared',), 'a')
+        self.assertIsNone(fragment_cache.get(('shared',)))
+        fragment_cache.set(('local',), 'a', ttl=60, tags=['Show'], local=True)
+        self.assertIsNone(fragment_cache.get(('local',)))
+        self.assertEqual(fragment_cache.get(('local',), local=True), 'a')
+        # invalidated in this process all the same
+        fragment_cache.invalidate('Show')
+        self.assertIsNone(fragment_cache.get(('local',), local=True))
+
+    def test_local_ttl(self):
+        with mock.patch('fragments.time.monotonic', return_value=1000.0):
+            fragment_cache.set(('local',), 'a', ttl=60, local=True)
+        with mock.patch('fragments.time.monotonic', return_value=1011.0):
+            self.assertIsNone(fragment_cache.get(('local',), local=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import io
+import json
+import unittest
+from unittest import mock
+
+import importer
+from models import db, Artist, Venue, Show
+from test_base import AppTestCase
+
+
+def ndjson(*rows):
+    return io.StringIO(''.join(json.dumps(row) + '\n' for row in rows))
+
+
+class ImportTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.artists = [{
+            'name': 'Artist %d' % i,
+            'city': 'San Francisco',
+            'state': 'CA',
+            'phone': '555-555-5555',
+            'genres': ['Jazz'],
+            'image_link': 'https://example.com/%d.jpg' % i,
+            'facebook_link': 'https://facebook.com/%d' % i,
+            'website': 'https://example.com/%d' % i,
+        } for i in range(3)]
+
+    def import_file(self, resource, *rows):
+        # (inserted, updated, rejected), without the summary on stdout
+        with mock.patch('click.echo'):
+            return importer.import_file(resource, ndjson(*rows), 'ndjson', 2)
+
+    def stamps(self, model):
+        db.session.expire_all()
+        return dict(db.session.query(model.id, model.updated_at))
+
+    def test_same_file_twice(self):
+        self.assertEqual(self.import_file('artists', *self.artists), (3, 0, 0))
+        stamps = self.stamps(Artist)
+        self.assertEqual(self.import_file('artists', *self.artists), (0, 0, 0))
+        self.assertEqual(self.stamps(Artist), stamps)
+
+    def test_changed_rows_only(self):
+        self.import_file('artists', *self.artists)
+        stamps = self.stamps(Artist)
+        self.artists[1]['website'] = 'https://example.com/new'
+        self.assertEqual(self.import_file('artists', *self.artists), (0, 1, 0))
+        changed = Artist.query.filter_by(name='Artist 1').one()
+        self.assertEqual(changed.website, 'https://example.com/new')
+        now = self.stamps(Artist)
+        self.assertGreater(now.pop(changed.id), stamps.pop(changed.id))
+        self.assertEqual(now, stamps)
+
+    def test_shows_twice(self):
+        artist_id = self.add_artist()
+        venue_id = self.add_venue()
+        other_venue_id = self.add_venue('Other venue')
+        shows = [{'artist_id': artist_id, 'venue_id': venue_id,
+                  'start_time': '2031-01-0%dT20:00:00' % day}
+                 for day in (3, 4, 5)]
+        self.assertEqual(self.import_file('shows', *shows), (3, 0, 0))
+        self.assertEqual(self.import_file('shows', *shows), (0, 0, 0))
+        shows[0]['venue_id'] = other_venue_id
+        self.assertEqual(self.import_file('shows', *shows), (0, 1, 0))
+        self.assertEqual(Show.query.filter_by(venue_id=venue_id).count(), 2)
+        db.session.expire_all()
+        self.assertEqual(
+            Venue.query.get(other_venue_id).upcoming_shows_count, 1)
+        self.assertEqual(Venue.query.get(venue_id).upcoming_shows_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
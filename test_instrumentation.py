@@ -0,0 +1,53 @@
+import re
+import unittest
+
+from instrumentation import NPlusOneError, statement_shape
+from models import db, Artist
+from test_base import AppTestCase
+
+SERVER_TIMING = re.compile(r'desc="(\d+) queries"')
+
+
+class NPlusOneTestCase(AppTestCase):
+    config = {'N_PLUS_ONE_THRESHOLD': 3}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        @cls.app.route('/test/queries/<int:count>')
+        def run_queries(count):
+            # the same statement `count` times, as a loop over rows would
+            for id in range(count):
+                db.session.query(Artist.name).filter(Artist.id == id).first()
+            return ''
+
+    def test_under_the_threshold(self):
+        response = self.client.get('/test/queries/3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(SERVER_TIMING.search(
+            response.headers['Server-Timing']).group(1), '3')
+
+    def test_over_the_threshold(self):
+        with self.assertRaisesRegex(NPlusOneError, r'4x SELECT'):
+            self.client.get('/test/queries/4')
+
+    def test_logged_outside_tests(self):
+        self.app.testing = False
+        try:
+            with self.assertLogs(self.app.logger, 'WARNING') as logs:
+                response = self.client.get('/test/queries/4')
+        finally:
+            self.app.testing = True
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('N+1', logs.output[0])
+
+    def test_statement_shape(self):
+        self.assertEqual(
+            statement_shape('SELECT name\n  FROM "Artist"\n'
+                            '  WHERE id IN (1, 2, 3)'),
+            statement_shape('SELECT name FROM "Artist" WHERE id IN (4)'))
+
+
+if __name__ == '__main__':
+    unittest.main()
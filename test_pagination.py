@@ -0,0 +1,49 @@
+import html
+import re
+import unittest
+
+from test_base import AppTestCase
+
+ARTIST_LINK = re.compile(r'href="/artists/(\d+)"')
+NEXT_LINK = re.compile(r'<li class="next"><a href="([^"]+)"')
+
+
+class AlphabeticalPageTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.names = ['apple', 'Banana', 'bongo', 'Mango', 'mellow', 'Zebra']
+        self.ids = {self.add_artist(name): name for name in self.names}
+
+    def listing(self, url):
+        # names of every page from `url` on, following the next links
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.get_data(as_text=True)
+            names += [self.ids[int(id)] for id in ARTIST_LINK.findall(page)]
+            link = NEXT_LINK.search(page)
+            url = html.unescape(link.group(1)) if link else None
+        return names
+
+    def test_pages_ignore_case(self):
+        self.assertEqual(self.listing('/artists?limit=2'), self.names)
+
+    def test_letter_ignores_case(self):
+        for letter in ('M', 'm'):
+            with self.subTest(letter=letter):
+                self.assertEqual(
+                    self.listing('/artists?letter=%s&limit=2' % letter),
+                    ['Mango', 'mellow', 'Zebra'])
+
+    def test_bad_letter(self):
+        for letter in ('AB', '1', '%C3%A9'):
+            with self.subTest(letter=letter):
+                self.assertEqual(
+                    self.client.get('/artists?letter=' + letter).status_code,
+                    400)
+
+
+if __name__ == '__main__':
+    unittest.main()
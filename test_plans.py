@@ -0,0 +1,42 @@
+import datetime
+import unittest
+
+from test_base import AppTestCase
+from config import TestConfig
+from models import db
+from benchmarks import check_plans, datagen
+
+
+# PostgreSQL rightly scans small tables sequentially, it is checked at
+# benchmark scale by `python -m benchmarks.check_plans` instead
+@unittest.skipUnless(TestConfig.SQLALCHEMY_DATABASE_URI.startswith('sqlite'),
+                     'query plans are checked on SQLite')
+class QueryPlanTestCase(AppTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # datagen seeds the test database, through the test app
+        datagen.setup(cls.app)
+
+    def test_no_sequential_scan_of_show(self):
+        # the hot requests of check_plans, on a small seeded database
+        summary = datagen.seed(1000)
+        requests = check_plans.hot_requests(
+            datetime.datetime.fromisoformat(summary['anchor']))
+        db.session.remove()
+        recorded = check_plans.record_statements(self.client, requests)
+        self.assertTrue(recorded)
+        connection = db.engine.raw_connection()
+        try:
+            for source, statement, parameters in recorded:
+                plan, seq_scan = check_plans.explain(
+                    connection, statement, parameters)
+                with self.subTest(source=source, statement=statement):
+                    self.assertFalse(seq_scan, plan)
+        finally:
+            connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+import sqlalchemy
+
+from models import db, Artist
+from routing import PRIMARY_COOKIE
+from test_base import AppTestCase
+
+REPLICAS = ['sqlite:///' + os.path.join(
+    tempfile.gettempdir(), 'fyyur_replica_%d.db' % i) for i in range(2)]
+
+
+class ReplicaRoutingTestCase(AppTestCase):
+    config = {'SQLALCHEMY_REPLICA_URIS': REPLICAS}
+
+    def setUp(self):
+        super().setUp()
+        self.add_artist('On the primary')
+        self.replicas = db.get_replicas(self.app).replicas
+        # every replica holds a different artist, to tell them apart
+        for i, replica in enumerate(self.replicas):
+            replica.down_until = 0.0
+            db.Model.metadata.drop_all(replica.engine)
+            db.Model.metadata.create_all(replica.engine)
+            replica.engine.execute(Artist.__table__.insert(), {
+                'name': 'On replica %d' % i, 'city': 'San Francisco',
+                'state': 'CA', 'phone': '555-555-5555', 'genres': ['Jazz']})
+
+    def tearDown(self):
+        for replica in self.replicas:
+            db.Model.metadata.drop_all(replica.engine)
+        super().tearDown()
+
+    def names(self):
+        # the artists a GET request reads, in a session of its own (the
+        # test's app context would keep using the one opened by setUp)
+        db.session.remove()
+        response = self.client.get('/api/v1/artists?fields=name')
+        db.session.remove()
+        return [artist['name'] for artist in response.get_json()['data']]
+
+    def test_round_robin(self):
+        self.assertEqual(sorted(self.names()[0] for _ in self.replicas),
+                         ['On replica 0', 'On replica 1'])
+
+    def test_read_your_writes(self):
+        response = self.client.post('/artists/search',
+                                    data={'search_term': 'x'})
+        self.assertIn(PRIMARY_COOKIE, response.headers['Set-Cookie'])
+        self.assertEqual(self.names(), ['On the primary'])
+        self.client.cookie_jar.clear()
+        self.assertNotEqual(self.names(), ['On the primary'])
+
+    def test_writes_stick_to_the_primary(self):
+        db.session.remove()
+        with self.app.test_request_context('/', method='GET'):
+            self.assertIn(db.session.get_bind(),
+                          [replica.engine for replica in self.replicas])
+            self.add_artist('Written')
+            self.assertIn('Written', [
+                name for name, in db.session.query(Artist.name)])
+            db.session.remove()
+
+    def test_fallback_to_the_primary(self):
+        engines = [replica.engine for replica in self.replicas]
+        try:
+            for replica in self.replicas:
+                replica.engine = sqlalchemy.create_engine(
+                    'sqlite:///' + os.path.join(tempfile.gettempdir(),
+                                                'missing', 'replica.db'))
+            self.assertEqual(self.names(), ['On the primary'])
+            # skipped until REPLICA_RETRY_SECONDS have passed
+            self.assertFalse(any(r.available() for r in self.replicas))
+        finally:
+            for replica, engine in zip(self.replicas, engines):
+                replica.engine = engine
+
+    def test_least_connections(self):
+        replicas = db.get_replicas(self.app)
+        replicas.selection = 'least-connections'
+        try:
+            connection = self.replicas[0].engine.connect()
+            try:
+                self.assertIs(replicas.pick(), self.replicas[1].engine)
+            finally:
+                connection.close()
+        finally:
+            replicas.selection = 'round-robin'
+
+
+if __name__ == '__main__':
+    unittest.main()
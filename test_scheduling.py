@@ -0,0 +1,93 @@
+import datetime
+import unittest
+
+from test_base import AppTestCase, local
+from models import db, Venue, Show
+import counters
+import deletion
+
+
+class ScheduleShowTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.artist_id = self.add_artist()
+        self.venue_id = self.add_venue()
+
+    def post(self, **form):
+        form.setdefault('artist_id', self.artist_id)
+        form.setdefault('venue_id', self.venue_id)
+        return self.client.post('/shows/create', data=form)
+
+    def start_times(self):
+        return [t for t, in db.session.query(Show.start_time).
+                order_by(Show.start_time)]
+
+    def assertFormError(self, response):
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.location.endswith('/shows/create'))
+        self.assertEqual(self.start_times(), [])
+
+    def test_weekly_show(self):
+        self.post(start_time='2031-01-03 20:00', repeat='weekly',
+                  repeat_until='2031-01-24')
+        self.assertEqual(self.start_times(), [
+            datetime.datetime(2031, 1, d, 20, 0) for d in (3, 10, 17, 24)])
+        self.assertEqual(self.flashes(), ['4 shows were successfully listed!'])
+        self.assertEqual(list(counters.check()), [])
+
+    def test_taken_occurrences_are_reported(self):
+        self.post(start_time='2031-01-10 20:00')
+        self.flashes()
+        self.post(start_time='2031-01-03 20:00', repeat='weekly',
+                  repeat_until='2031-01-17')
+        self.assertEqual(len(self.start_times()), 3)
+        self.assertEqual(self.flashes(), [
+            '2 shows were successfully listed!',
+            'The artist already has a show at 2031-01-10 20:00, '
+            'not listed again.'])
+
+    def test_aware_times_are_local_times(self):
+        start = datetime.datetime(2031, 1, 3, 20, 0,
+                                  tzinfo=datetime.timezone.utc)
+        response = self.post(start_time='2031-01-03T20:00:00Z',
+                             repeat='weekly',
+                             repeat_until='2031-01-10T23:00:00+00:00')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.start_times(), [
+            local(start), local(start + datetime.timedelta(weeks=1))])
+
+    def test_bad_input_is_a_form_error(self):
+        for form in ({'start_time': 'tonight'},
+                     {'start_time': '2031-01-03 20:00', 'artist_id': 'x'},
+                     {'start_time': '0001-01-01T00:00+14:00'},
+                     {'start_time': '2031-01-03 20:00', 'duration': '2000'},
+                     {'start_time': '2031-01-03 20:00', 'repeat': 'yearly',
+                      'repeat_until': '2032-01-01'}):
+            with self.subTest(form=form):
+                self.assertFormError(self.post(**form))
+                self.assertEqual(len(self.flashes()), 1)
+
+    def test_last_representable_dates(self):
+        self.post(start_time='9999-12-20 20:00', repeat='weekly',
+                  repeat_until='9999-12-31')
+        self.assertEqual(len(self.start_times()), 2)
+
+    def test_out_of_range_is_a_form_error(self):
+        # the show (or its last occurrence) would end after datetime.max,
+        # or be looked for from before datetime.min
+        for form in ({'start_time': '9999-12-31 23:00'},
+                     {'start_time': '9999-12-24 23:00', 'repeat': 'weekly',
+                      'repeat_until': '9999-12-31'},
+                     {'start_time': '0001-01-01 00:00'}):
+            with self.subTest(form=form):
+                self.assertFormError(self.post(**form))
+                self.assertEqual(len(self.flashes()), 1)
+
+    def test_deleted_venue(self):
+        deletion.delete(Venue, [self.venue_id], soft=True)
+        self.assertFormError(self.post(start_time='2031-01-03 20:00'))
+
+
+if __name__ == '__main__':
+    unittest.main()
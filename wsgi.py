@@ -0,0 +1,11 @@
+import os
+from app import create_app
+
+#----------------------------------------------------------------------------#
+# WSGI entry point.
+#----------------------------------------------------------------------------#
+#   gunicorn wsgi:app
+# reads its settings from gunicorn.conf.py. The production profile is used
+# unless FYYUR_ENV names another one.
+
+app = create_app(os.environ.get('FYYUR_ENV', 'production'))